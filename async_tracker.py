@@ -0,0 +1,665 @@
+import asyncio
+import os
+import time
+import aiohttp
+from urllib.parse import urlsplit
+import http_client
+import metrics
+from cache import get_cache
+from chapter_history import HISTORY_PAGE_SIZE, get_chapter_history
+from outbox import get_outbox
+from host_scheduler import HostPausedError, get_scheduler, is_config_error
+from manga_scraper import (
+    HEADERS,
+    PARSE_QUEUE_SIZE,
+    SCRAPER_RETRIES,
+    conditional_headers,
+    needs_refetch,
+    cached_page_result,
+    remember_page,
+    timed_parse,
+    get_parse_pool,
+)
+from datetime import datetime, timezone
+from mangadex_tracker import (
+    CYCLE_DEADLINE,
+    MANGADEX_BATCH_SIZE,
+    FEED_MAX_OFFSET,
+    load_feed_cursor,
+    save_feed_cursor,
+    chapter_feed_params,
+    collect_tracked_chapters,
+    record_latest_chapters,
+    history_feed_params,
+    CONTENT_RATINGS,
+    evaluate_series_update,
+    series_update_message,
+    save_observed_series,
+    format_manga_info,
+    persist_cycle_state,
+    record_cycle_metrics,
+    find_series_by_title,
+)
+
+# Native asyncio versions of the tracker lookups, so the Discord bot can
+# poll without blocking its event loop.
+
+# How many HTTP requests may be in flight at once
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(
+    sock_connect=http_client.DEFAULT_TIMEOUT[0],
+    sock_read=http_client.DEFAULT_TIMEOUT[1],
+)
+
+# key of the MangaDex lookup among a cycle's jobs (the others are manga ids)
+MANGADEX = "mangadex"
+
+_session = None
+_semaphore = None
+_parse_slots = None
+
+
+# --- Client ---
+
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """Raised instead of calling a host whose circuit is open."""
+
+    circuit_open = True
+
+
+def get_session():
+    """Shared aiohttp session, created lazily on the running event loop."""
+    global _session, _semaphore
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            timeout=REQUEST_TIMEOUT,
+            headers={"User-Agent": http_client.USER_AGENT},
+            connector=aiohttp.TCPConnector(limit_per_host=http_client.POOL_SIZE),
+        )
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def get_json(url, params=None):
+    return await _get(url, params=params, read=lambda r: r.json())
+
+
+async def get_text(url, headers=None):
+    return await _get(url, headers=headers, read=lambda r: r.text())
+
+
+async def get_page(url, headers=None, retries=http_client.MAX_RETRIES):
+    """(status, headers, text) so callers can see 304s and validators."""
+    async def read(response):
+        return response.status, response.headers, await response.text()
+
+    return await _get(url, headers=headers, read=read, retries=retries)
+
+
+async def _get(url, read, params=None, headers=None, retries=http_client.MAX_RETRIES):
+    """
+    GET through the shared per-host token buckets and circuit breakers,
+    retrying 429s and 5xx. The call is cut off at the host's latency budget
+    (asyncio.TimeoutError), counted from when the first request is sent, so
+    waiting for a token or a free slot doesn't use it up.
+    """
+    host = urlsplit(url).hostname
+    breaker = http_client.breaker_for(host)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {host}, skipping {url}")
+
+    try:
+        result = await _get_with_retries(url, host, read, params, headers, retries)
+    except aiohttp.ClientResponseError as e:
+        if e.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+        breaker.record_failure()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+async def _get_with_retries(url, host, read, params, headers, retries):
+    session = get_session()
+    bucket = http_client.bucket_for(host)
+    loop = asyncio.get_running_loop()
+    deadline = None
+
+    async def send(attempt):
+        """One attempt: (True, result), or (False, delay) if it should be retried."""
+        started = time.perf_counter()
+        try:
+            response = await session.get(url, params=_encode_params(params), headers=headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            http_client.notify_request(host, url, None, time.perf_counter() - started)
+            raise
+        async with response:
+            http_client.notify_request(host, url, response.status, time.perf_counter() - started)
+            http_client.note_rate_limit(bucket, response.headers)
+            if response.status not in http_client.RETRY_STATUSES or attempt >= retries:
+                response.raise_for_status()
+                return True, await read(response)
+
+            delay = http_client.retry_delay(response.headers, attempt)
+            if response.status == 429:
+                bucket.pause(delay)
+            # don't start a retry that would run past the latency budget
+            if loop.time() + delay > deadline:
+                response.raise_for_status()
+            print(f"⏳ {response.status} from {url}, retrying in {delay:.1f}s")
+            return False, delay
+
+    for attempt in range(retries + 1):
+        # wait for the host's token before taking one of the shared slots, so
+        # a paused host doesn't hold them while requests to other hosts queue
+        wait = bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        async with _semaphore:
+            if deadline is None:
+                deadline = loop.time() + http_client.latency_budget(host)
+            done, value = await asyncio.wait_for(send(attempt), max(0.0, deadline - loop.time()))
+        if done:
+            return value
+        await asyncio.sleep(value)
+
+
+async def gather_bounded(coros, limit=MAX_CONCURRENT_REQUESTS):
+    """asyncio.gather, but with at most `limit` of the coroutines started at once."""
+    slots = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with slots:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+def _encode_params(params):
+    """aiohttp doesn't expand lists like requests does, so do it here."""
+    if not params:
+        return None
+    encoded = []
+    for key, value in params.items():
+        if isinstance(value, (list, tuple)):
+            encoded.extend((key, str(v)) for v in value)
+        else:
+            encoded.append((key, str(value)))
+    return encoded
+
+
+# --- Lookup Functions --- #
+async def get_latest_english_chapter(manga_id, return_message=False):
+    url = f"{http_client.MANGADEX_API}/chapter"
+    params = {
+        "manga": manga_id,
+        "limit": 1,
+        "order[createdAt]": "desc",
+        "translatedLanguage[]": "en",
+    }
+
+    try:
+        with metrics.timer("tracker_lookup_duration_seconds", lookup="mangadex"):
+            data = await get_json(url, params)
+
+        if data["data"]:
+            chapter = data["data"][0]
+            chapter_id = chapter["id"]
+            chapter_attrs = chapter["attributes"]
+
+            if return_message:
+                chapter_number = chapter_attrs.get("chapter", "N/A")
+                chapter_title = chapter_attrs.get("title", "No title")
+                publish_date = chapter_attrs.get("publishAt", "Unknown Date")
+                url = f"https://mangadex.org/chapter/{chapter_id}"
+
+                message = (
+                    f"📘 **Latest English Chapter Info:**\n"
+                    f"• Chapter {chapter_number}: {chapter_title}\n"
+                    f"• Published: {publish_date}\n"
+                    f"🔗 {url}"
+                )
+                return chapter_id, chapter_attrs, message
+
+            return chapter_id, chapter_attrs, None
+        else:
+            return None, None, "⚠️ No English chapters found."
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error_msg = f"❌ Request error for manga {manga_id}: {e}"
+        print(error_msg)
+        return None, None, error_msg
+
+
+async def get_latest_english_chapters(manga_ids):
+    """Async counterpart of mangadex_tracker.get_latest_english_chapters."""
+    batches = [
+        manga_ids[start:start + MANGADEX_BATCH_SIZE]
+        for start in range(0, len(manga_ids), MANGADEX_BATCH_SIZE)
+    ]
+    latest = {}
+    for batch_result in await gather_bounded(_latest_for_batch(b) for b in batches):
+        latest.update(batch_result)
+
+    unresolved = [mid for mid in manga_ids if mid not in latest]
+    results = await gather_bounded(get_latest_english_chapter(mid) for mid in unresolved)
+    for manga_id, (chapter_id, chapter_attrs, _) in zip(unresolved, results):
+        latest[manga_id] = (chapter_id, chapter_attrs)
+
+    await asyncio.to_thread(record_latest_chapters, latest)
+    return latest
+
+
+async def _latest_for_batch(batch):
+    latest = {}
+    try:
+        data = await get_json(f"{http_client.MANGADEX_API}/manga", {
+            "ids[]": batch,
+            "limit": len(batch),
+            "contentRating[]": CONTENT_RATINGS,
+        })
+        uploads = {}
+        for entry in data["data"]:
+            chapter_id = entry["attributes"].get("latestUploadedChapter")
+            if chapter_id:
+                uploads[chapter_id] = entry["id"]
+
+        if uploads:
+            data = await get_json(f"{http_client.MANGADEX_API}/chapter", {
+                "ids[]": list(uploads),
+                "limit": len(uploads),
+                "order[createdAt]": "desc",
+                "translatedLanguage[]": "en",
+                "contentRating[]": CONTENT_RATINGS,
+            })
+            for chapter in data["data"]:
+                manga_id = uploads.get(chapter["id"])
+                if manga_id and manga_id not in latest:
+                    latest[manga_id] = (chapter["id"], chapter["attributes"])
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"❌ Batched chapter lookup failed, falling back per series: {e}")
+
+    return latest
+
+
+async def get_english_chapters_since(since, tracked_ids):
+    """Async counterpart of mangadex_tracker.get_english_chapters_since."""
+    url = f"{http_client.MANGADEX_API}/chapter"
+    latest = {}
+    offset = 0
+
+    while True:
+        data = await get_json(url, chapter_feed_params(since, offset))
+        chapters = data["data"]
+
+        get_chapter_history().record(collect_tracked_chapters(chapters, tracked_ids, latest))
+
+        offset += len(chapters)
+        if not chapters or offset >= data.get("total", 0):
+            return latest
+
+        if offset + MANGADEX_BATCH_SIZE > FEED_MAX_OFFSET:
+            since = chapters[-1]["attributes"]["createdAt"][:19]
+            offset = 0
+
+
+async def sync_chapter_history(manga_id):
+    """Async counterpart of mangadex_tracker.sync_chapter_history."""
+    url = f"{http_client.MANGADEX_API}/manga/{manga_id}/feed"
+    history = get_chapter_history()
+    since = history.sync_cursor(manga_id)
+    offset = 0
+    stored = 0
+
+    while True:
+        data = await get_json(url, history_feed_params(since, offset))
+        chapters = data["data"]
+
+        stored += history.record(chapters, manga_id)
+        if chapters:
+            history.save_sync(manga_id, chapters[-1]["attributes"]["createdAt"])
+
+        offset += len(chapters)
+        if not chapters or offset >= data.get("total", 0):
+            history.save_sync(manga_id)
+            return stored
+
+        if offset + HISTORY_PAGE_SIZE > FEED_MAX_OFFSET:
+            since = chapters[-1]["attributes"]["createdAt"]
+            offset = 0
+
+
+async def get_release_history(manga_id, limit=10):
+    """
+    Publish times (unix seconds) of the most recent English chapters plus the
+    series status, in one /manga/{id}/feed request. Used by poll_scheduler
+    to learn a series' release pattern.
+    """
+    url = f"{http_client.MANGADEX_API}/manga/{manga_id}/feed"
+    params = {
+        "limit": limit,
+        "order[publishAt]": "desc",
+        "translatedLanguage[]": "en",
+        "includes[]": "manga",
+        "contentRating[]": CONTENT_RATINGS,
+    }
+    try:
+        data = await get_json(url, params)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"❌ Could not fetch release history for {manga_id}: {e}")
+        return [], None
+
+    release_times = []
+    status = None
+    for chapter in data["data"]:
+        publish_at = chapter["attributes"].get("publishAt")
+        if publish_at:
+            release_times.append(datetime.fromisoformat(publish_at).timestamp())
+        for rel in chapter.get("relationships", []):
+            if rel.get("type") == "manga" and "attributes" in rel:
+                status = rel["attributes"].get("status", status)
+    return release_times, status
+
+
+def _get_parse_slots():
+    global _parse_slots
+    if _parse_slots is None:
+        _parse_slots = asyncio.Semaphore(PARSE_QUEUE_SIZE)
+    return _parse_slots
+
+
+async def get_latest_chapter_from_config(series):
+    """Fetch the page asynchronously and parse it in the scraper's process pool."""
+    with metrics.timer("tracker_lookup_duration_seconds", lookup="scraper"):
+        return await _latest_chapter_from_config(series)
+
+
+async def _latest_chapter_from_config(series):
+    url = series["check_url"]
+    try:
+        async with get_scheduler().slot(url):
+            status, headers, html = await get_page(
+                url, headers=conditional_headers(series), retries=SCRAPER_RETRIES
+            )
+            if needs_refetch(series, status):
+                status, headers, html = await get_page(url, headers=HEADERS, retries=SCRAPER_RETRIES)
+    except HostPausedError as e:
+        print(f"⏭️ Skipping {url}: {e} is paused")
+        return None, None
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        if is_config_error(e):
+            print(f"⚠️ Scraper config for {url} is invalid: {e}")
+        else:
+            print(f"Failed to fetch {url}: {e}")
+        return None, None
+
+    chapter, content_hash = cached_page_result(series, status, html)
+    if chapter is None:
+        # parse stage: bounded, in the shared process pool
+        async with _get_parse_slots():
+            try:
+                chapter, elapsed = await asyncio.get_running_loop().run_in_executor(
+                    get_parse_pool(), timed_parse, series, html
+                )
+                metrics.observe("tracker_parse_duration_seconds", elapsed)
+            except Exception as e:
+                print(f"❌ Failed to parse {url}: {e}")
+                chapter = (None, None)
+    remember_page(series, headers, content_hash, chapter)
+    return chapter
+
+
+async def fetch_manga_info(manga_id):
+    async def fetch():
+        data = await get_json(f"{http_client.MANGADEX_API}/manga/{manga_id}")
+        return data["data"]
+
+    try:
+        return await get_cache().aget_or_fetch("manga_info", manga_id, fetch)
+    except Exception as e:
+        print(f"❌ Error fetching manga info: {e}")
+        return None
+
+
+async def show_manga_info(title, observed_series):
+    for mid, info in find_series_by_title(title, observed_series):
+        return format_manga_info(info, await fetch_manga_info(mid))
+
+    return "❌ No tracked series match that title."
+
+
+# --- Tracker ---
+
+async def check_for_updates(observed_series, return_messages=False, deferred=None, on_message=None):
+    """Same as mangadex_tracker.check_for_updates, with all fetches run concurrently."""
+    md_fetch = get_latest_english_chapters(list(observed_series.keys()))
+    _, messages = await _run_cycle(
+        observed_series, md_fetch, None, return_messages, deferred, on_message
+    )
+    return messages if return_messages else None
+
+
+async def check_for_updates_incremental(
+    observed_series, return_messages=False, scraper_ids=None, deferred=None, on_message=None
+):
+    """
+    Async counterpart of mangadex_tracker.check_for_updates_incremental.
+    scraper_ids limits which series' optional scrapers run this cycle
+    (e.g. the ones poll_scheduler says are due); None runs them all.
+    If a set is passed as `deferred`, the ids of series that weren't
+    checked before the cycle deadline are added to it. on_message(msg) is
+    called with each update as soon as its series has been checked.
+    """
+    cycle_started_at = datetime.now(timezone.utc)
+    since = load_feed_cursor()
+
+    async def feed():
+        if since is None:
+            # first run: a full lookup establishes the cursor
+            return await get_latest_english_chapters(list(observed_series))
+        try:
+            return await get_english_chapters_since(since, set(observed_series))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Incremental chapter feed failed: {e}")
+            return None
+
+    md_latest, messages = await _run_cycle(
+        observed_series, feed(), scraper_ids, return_messages, deferred, on_message
+    )
+    # keep the cursor if the feed failed or ran out of time, so the next
+    # cycle covers this window again
+    if md_latest is not None:
+        save_feed_cursor(cycle_started_at)
+
+    return messages if return_messages else None
+
+
+async def _run_cycle(observed_series, md_fetch, scraper_ids, return_messages, deferred, on_message=None):
+    """
+    Run the MangaDex lookup and the optional scrapers concurrently until
+    CYCLE_DEADLINE. Each series is evaluated as soon as all of its sources
+    have answered (or at the deadline with whatever did). Returns
+    (md_latest, messages); md_latest is None if the lookup didn't finish.
+    """
+    started = time.perf_counter()
+    deadline = asyncio.get_running_loop().time() + CYCLE_DEADLINE
+    scraper_ids = [
+        mid for mid, data in observed_series.items()
+        if (data.optional_scraper or {}).get("check_url")
+        and (scraper_ids is None or mid in scraper_ids)
+    ]
+    jobs = {
+        mid: get_latest_chapter_from_config(observed_series[mid].optional_scraper)
+        for mid in scraper_ids
+    }
+    jobs[MANGADEX] = _timed(md_fetch, lookup="mangadex_cycle")
+
+    messages = []
+    md_done = False
+    md_latest = None
+    scraper_results = {}
+    evaluated = set()
+    updates = []  # (manga_id, update) waiting for write_updates
+    writer = None
+
+    def evaluate(manga_id):
+        evaluated.add(manga_id)
+        series_data = observed_series.get(manga_id)
+        if series_data is None:  # removed while we were fetching
+            return
+        md_latest_id, md_chapter_info = (md_latest or {}).get(manga_id, (None, None))
+        update = evaluate_series_update(
+            manga_id, series_data, md_latest_id, md_chapter_info,
+            scraper_results.get(manga_id),
+        )
+        if update:
+            updates.append((manga_id, update))
+
+    async def write_updates():
+        # the outbox fsync and the series saves run in a thread; updates
+        # found meanwhile go into the next batch
+        while updates:
+            batch = updates[:]
+            updates.clear()
+            try:
+                await _record_updates(
+                    observed_series, batch, messages,
+                    return_messages or on_message is not None, on_message,
+                )
+            except Exception as e:
+                # not advanced, so the next cycle finds them again
+                print(f"❌ Recording {len(batch)} updates failed: {e!r}")
+
+    def start_writer():
+        nonlocal writer
+        if updates and (writer is None or writer.done()):
+            writer = asyncio.ensure_future(write_updates())
+
+    def evaluate_pending(final=False):
+        for manga_id in list(observed_series):
+            if manga_id in evaluated:
+                continue
+            if manga_id not in (md_latest or {}) and manga_id not in scraper_results:
+                continue
+            # a series with a scraper running waits for it, until the deadline
+            if final or manga_id not in jobs or manga_id in scraper_results:
+                evaluate(manga_id)
+
+    def on_result(key, result):
+        nonlocal md_done, md_latest
+        if key == MANGADEX:
+            md_done, md_latest = True, result
+            evaluate_pending()
+        else:
+            scraper_results[key] = result
+            if md_done:
+                evaluate(key)
+        start_writer()
+
+    await _run_until(deadline, jobs, on_result)
+    if not md_done:
+        print("⏱️ MangaDex lookup didn't finish before the cycle deadline")
+
+    unchecked = [mid for mid in scraper_ids if mid not in scraper_results]
+    if unchecked:
+        print(f"⏱️ Deferring {len(unchecked)} scraper checks to the next cycle")
+        if deferred is not None:
+            deferred.update(unchecked)
+
+    evaluate_pending(final=True)
+    start_writer()
+    if writer is not None:
+        await writer
+    await asyncio.to_thread(persist_cycle_state)
+    record_cycle_metrics("async", started, observed_series, len(unchecked))
+    return md_latest, messages
+
+
+async def _record_updates(observed_series, batch, messages, notify, on_message=None):
+    """
+    record_series_update for a batch of (manga_id, update), with the disk
+    writes off the event loop: one outbox transaction for all of their
+    notifications, which still lands before last_chapter_number moves on,
+    then the series saves.
+    """
+    batch = [(mid, update) for mid, update in batch if mid in observed_series]
+    new = []
+    if notify and batch:
+        new = [series_update_message(observed_series[mid], update) for mid, update in batch]
+        await asyncio.to_thread(get_outbox().add_many, new)
+        messages.extend(new)
+
+    saved = []
+    for manga_id, (latest_chapter_number, _) in batch:
+        series_data = observed_series.get(manga_id)
+        if series_data is None:  # removed while the outbox was written
+            continue
+        metrics.inc("tracker_updates_total")
+        if not notify:
+            print(f"New chapter for {series_data.title}: {latest_chapter_number}")
+        series_data.last_chapter_number = latest_chapter_number
+        saved.append(manga_id)
+    await asyncio.to_thread(_save_series, observed_series, saved)
+
+    if on_message is not None:
+        for msg in new:
+            on_message(msg)
+
+
+def _save_series(observed_series, manga_ids):
+    for manga_id in manga_ids:
+        save_observed_series(observed_series, manga_id)
+
+
+async def _timed(coro, **labels):
+    with metrics.timer("tracker_lookup_duration_seconds", **labels):
+        return await coro
+
+
+async def _run_until(deadline, jobs, on_result=None):
+    """
+    Run {key: coroutine} concurrently until the event loop time `deadline`,
+    calling on_result(key, result) as each one finishes. Returns
+    {key: result} for the jobs that finished; the rest are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    tasks = {asyncio.ensure_future(coro): key for key, coro in jobs.items()}
+    pending = set(tasks)
+    results = {}
+    try:
+        while pending:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                key = tasks[task]
+                try:
+                    results[key] = task.result()
+                except Exception as e:
+                    print(f"❌ Check for {key} failed: {e}")
+                    continue
+                if on_result is not None:
+                    on_result(key, results[key])
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return results
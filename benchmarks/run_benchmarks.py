@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.request import Request, urlopen
+
+# Runs full poll cycles against benchmarks/standin_server.py over synthetic
+# libraries and reports, per library size and tracker mode: requests per
+# cycle, wall time, p50/p99 request latency and peak RSS, as JSON.
+#
+#   python benchmarks/run_benchmarks.py                        # 10, 1k, 10k series
+#   python benchmarks/run_benchmarks.py --sizes 10 1000 --output before.json
+#
+# Every (size, mode) runs in its own process, in a throwaway working
+# directory, so state files, caches and peak RSS don't leak between runs.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+DEFAULT_SIZES = [10, 1000, 10000]
+# sync: mangadex_tracker.check_for_updates
+# async: async_tracker.check_for_updates
+# async-incremental: async_tracker.check_for_updates_incremental (first cycle sets the cursor)
+MODES = ["sync", "async", "async-incremental"]
+DEFAULT_CYCLES = 3
+
+# The stand-in is one process on loopback; the tracker's real per-host
+# limits would make a 10k-series cycle measure our own throttling. The
+# API is reached as 127.0.0.1 and scraper pages as localhost, so they
+# get separate buckets and politeness slots like they would in production.
+API_HOST = "127.0.0.1"
+SCRAPER_HOST = "localhost"
+BENCH_RATE_LIMIT = (200, 200)
+BENCH_POLITENESS = (8, 0.0)
+SERVER_RATE_LIMIT = 100000
+
+
+# --- Stand-in server ---
+
+def start_server(size, args):
+    command = [
+        sys.executable, os.path.join(BENCH_DIR, "standin_server.py"),
+        "--size", str(size),
+        "--rate-limit", str(args.server_rate_limit),
+        "--window", "1",
+        "--error-rate", str(args.error_rate),
+        "--latency", str(args.latency),
+    ]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("listening "):
+        server.kill()
+        raise RuntimeError(f"Stand-in server didn't start: {line!r}")
+    return server, int(line.split()[1])
+
+
+def control(port, path, method="GET"):
+    request = Request(f"http://{API_HOST}:{port}{path}", method=method)
+    with urlopen(request, timeout=60) as response:
+        return json.load(response)
+
+
+# --- One (size, mode) run, in a child process ---
+
+def percentile(values, share):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_child(port, mode, cycles):
+    os.environ["MANGADEX_API_URL"] = f"http://{API_HOST}:{port}"
+    os.environ["CYCLE_DEADLINE"] = os.getenv("CYCLE_DEADLINE", "3600")
+    os.environ["METADATA_CACHE_DISK"] = "0"
+    os.chdir(tempfile.mkdtemp(prefix="mangadex_bench_"))
+    sys.path.insert(0, REPO_DIR)
+
+    import http_client
+    import host_scheduler
+    import mangadex_tracker
+
+    http_client.HOST_RATE_LIMITS[API_HOST] = BENCH_RATE_LIMIT
+    http_client.HOST_RATE_LIMITS[SCRAPER_HOST] = BENCH_RATE_LIMIT
+    host_scheduler.HOST_POLITENESS[SCRAPER_HOST] = BENCH_POLITENESS
+
+    samples = []
+    http_client.REQUEST_HOOKS.append(
+        lambda host, url, status, elapsed: samples.append((host, status, elapsed))
+    )
+
+    mangadex_tracker.save_observed_series(control(port, "/__library"))
+    mangadex_tracker.flush_observed_series()
+    observed_series = mangadex_tracker.load_observed_series()
+
+    if mode == "sync":
+        def cycle():
+            return mangadex_tracker.check_for_updates(observed_series, return_messages=True)
+    else:
+        import asyncio
+        import async_tracker
+        check = (
+            async_tracker.check_for_updates if mode == "async"
+            else async_tracker.check_for_updates_incremental
+        )
+        loop = asyncio.new_event_loop()
+
+        def cycle():
+            return loop.run_until_complete(check(observed_series, return_messages=True))
+
+    results = []
+    for number in range(cycles):
+        released = control(port, "/__advance", "POST")["released"]
+        del samples[:]
+        started = time.perf_counter()
+        messages = cycle() or []
+        wall = time.perf_counter() - started
+
+        latencies = [elapsed for _, status, elapsed in samples if status is not None]
+        statuses = {}
+        for _, status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        results.append({
+            "cycle": number,
+            "released": released,
+            "notifications": len(messages),
+            "requests": len(samples),
+            "requests_by_host": {
+                host: sum(1 for h, _, _ in samples if h == host)
+                for host in sorted({h for h, _, _ in samples})
+            },
+            "statuses": statuses,
+            "wall_seconds": round(wall, 4),
+            "latency_p50_ms": _ms(percentile(latencies, 0.50)),
+            "latency_p99_ms": _ms(percentile(latencies, 0.99)),
+        })
+
+    if mode != "sync":
+        loop.run_until_complete(async_tracker.close_session())
+        loop.close()
+    mangadex_tracker.flush_observed_series()
+
+    return {"cycles": results, "peak_rss_mb": peak_rss_mb()}
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+# --- Driver ---
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(args):
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "settings": {
+            "cycles": args.cycles,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "server_rate_limit": args.server_rate_limit,
+        },
+        "runs": [],
+        "server_stats": {},
+    }
+
+    for size in args.sizes:
+        server, port = start_server(size, args)
+        try:
+            for mode in args.modes:
+                print(f"🔄 {size} series, {mode}...", file=sys.stderr)
+                child = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", mode,
+                     "--port", str(port), "--cycles", str(args.cycles)],
+                    capture_output=True, text=True,
+                )
+                if child.returncode != 0:
+                    print(f"❌ {size} series, {mode} failed:\n{child.stderr}", file=sys.stderr)
+                    report["runs"].append({"size": size, "mode": mode, "error": child.stderr[-2000:]})
+                    continue
+                # the tracker prints progress too; the result is the last line
+                result = json.loads(child.stdout.strip().splitlines()[-1])
+                report["runs"].append({"size": size, "mode": mode, **result})
+            # what the stand-in saw across all modes for this library size
+            report["server_stats"][str(size)] = control(port, "/__stats")
+        finally:
+            server.terminate()
+            server.wait()
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark poll cycles against a local MangaDex stand-in")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--cycles", type=int, default=DEFAULT_CYCLES)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stand-in adds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of API requests answered 429")
+    parser.add_argument("--server-rate-limit", type=int, default=SERVER_RATE_LIMIT,
+                        help="requests per second before the stand-in answers 429")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.port, args.child, args.cycles)))
+        sys.exit(0)
+
+    report = json.dumps(run_all(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+        print(f"✅ Wrote {args.output}", file=sys.stderr)
+    else:
+        print(report)
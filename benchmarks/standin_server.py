@@ -0,0 +1,379 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Local stand-in for the parts of the MangaDex API the tracker uses
+# (/manga, /manga/{id}, /manga/{id}/feed, /chapter) plus scraper chapter-list
+# pages, over a synthetic library. It sends MangaDex-style rate-limit
+# headers, answers 429 when the client goes over the limit (and, if asked,
+# at random), and supports ETag revalidation on scraper pages.
+#
+#   python benchmarks/standin_server.py --size 1000 --port 8400
+#
+# Control endpoints: GET /__library (observed_series for the library),
+# POST /__advance (release new chapters), GET /__stats (request counters).
+
+PAGE_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "chapter_list.html")
+
+CHAPTERS_PER_SERIES = 40
+# chapter rows rendered into a scraper page
+PAGE_CHAPTERS = 100
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+
+class Library:
+    """A synthetic library: every series has a chapter list; advance() releases more."""
+
+    def __init__(self, size, scraper_share=0.1, update_share=0.05, seed=1):
+        self.rng = random.Random(seed)
+        self.update_share = update_share
+        self.lock = threading.Lock()
+        self.series = {}
+        self.chapters = {}       # chapter_id -> chapter
+        self.by_created = []     # (created_at, chapter_id), for createdAtSince feeds
+
+        for i in range(size):
+            manga_id = self._uuid()
+            self.series[manga_id] = {
+                "title": f"Benchmark Series {i}",
+                "status": self.rng.choice(["ongoing", "ongoing", "ongoing", "hiatus", "completed"]),
+                "chapters": [],
+                "scraper": self.rng.random() < scraper_share,
+            }
+            start = EPOCH + timedelta(days=self.rng.randrange(300))
+            for n in range(1, CHAPTERS_PER_SERIES + 1):
+                self._add_chapter(manga_id, n, start + timedelta(days=7 * n))
+
+    def _uuid(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _add_chapter(self, manga_id, number, created_at):
+        chapter = {
+            "id": self._uuid(),
+            "manga_id": manga_id,
+            "number": str(number),
+            "created_at": iso(created_at),
+        }
+        self.series[manga_id]["chapters"].append(chapter)
+        self.chapters[chapter["id"]] = chapter
+        bisect.insort(self.by_created, (chapter["created_at"], chapter["id"]))
+        return chapter
+
+    def advance(self):
+        """Release one new chapter for a random share of the series. Returns how many."""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            released = 0
+            for manga_id, series in self.series.items():
+                if self.rng.random() < self.update_share:
+                    number = int(series["chapters"][-1]["number"]) + 1
+                    self._add_chapter(manga_id, number, now)
+                    released += 1
+            return released
+
+    def observed_series(self, scraper_base):
+        """The library in observed_series.json format, as if it had been tracked a while ago."""
+        observed = {}
+        for manga_id, series in self.series.items():
+            latest = series["chapters"][-1]
+            observed[manga_id] = {
+                "title": series["title"],
+                "last_chapter_id": latest["id"],
+                "last_chapter_number": latest["number"],
+                "last_chapter_title": None,
+                "cover_url": None,
+                "read_chapters": [f"1-{int(latest['number']) // 2}"],
+            }
+            if series["scraper"]:
+                observed[manga_id]["optional_scraper"] = {
+                    "check_url": f"{scraper_base}/series/{manga_id}",
+                    "check_selector": "ul.chapter-list li a",
+                    "read_url_template": f"{scraper_base}/series/{manga_id}/chapter-{{}}",
+                }
+        return observed
+
+    # --- JSON shapes ---
+
+    def manga_json(self, manga_id, includes=()):
+        series = self.series[manga_id]
+        relationships = []
+        if "cover_art" in includes:
+            relationships.append({
+                "id": self._uuid(), "type": "cover_art",
+                "attributes": {"fileName": f"{manga_id[:8]}.jpg"},
+            })
+        return {
+            "id": manga_id,
+            "type": "manga",
+            "attributes": {
+                "title": {"en": series["title"]},
+                "altTitles": [{"ja": series["title"].upper()}],
+                "description": {"en": "A synthetic series for benchmarks."},
+                "status": series["status"],
+                "tags": [],
+                "latestUploadedChapter": series["chapters"][-1]["id"],
+            },
+            "relationships": relationships,
+        }
+
+    def chapter_json(self, chapter, includes=()):
+        manga_rel = {"id": chapter["manga_id"], "type": "manga"}
+        if "manga" in includes:
+            manga_rel["attributes"] = {"status": self.series[chapter["manga_id"]]["status"]}
+        return {
+            "id": chapter["id"],
+            "type": "chapter",
+            "attributes": {
+                "chapter": chapter["number"],
+                "volume": str((int(chapter["number"]) - 1) // 10 + 1),
+                "title": f"Chapter {chapter['number']}",
+                "translatedLanguage": "en",
+                "publishAt": chapter["created_at"],
+                "createdAt": chapter["created_at"],
+            },
+            "relationships": [manga_rel],
+        }
+
+
+class RateLimiter:
+    """MangaDex-style fixed window: `limit` requests per `window` seconds per client."""
+
+    def __init__(self, limit, window, error_rate=0.0):
+        self.limit = limit
+        self.window = window
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.windows = {}   # client -> (window_start, count)
+        self.rng = random.Random(7)
+
+    def check(self, client):
+        """(allowed, remaining, retry_at)."""
+        now = time.time()
+        with self.lock:
+            start, count = self.windows.get(client, (now, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            count += 1
+            self.windows[client] = (start, count)
+            injected = self.rng.random() < self.error_rate
+        allowed = count <= self.limit and not injected
+        return allowed, max(0, self.limit - count), start + self.window
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MangaDexStandIn/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Plumbing ---
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def count(self, kind, status):
+        stats = self.server.stats
+        with self.server.stats_lock:
+            stats["requests"] += 1
+            stats["by_endpoint"][kind] = stats["by_endpoint"].get(kind, 0) + 1
+            stats["by_status"][str(status)] = stats["by_status"].get(str(status), 0) + 1
+
+    def do_POST(self):
+        if urlsplit(self.path).path == "/__advance":
+            self.send_json(200, {"released": self.server.library.advance()})
+        else:
+            self.send_json(404, {"result": "error"})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        path = parts.path.rstrip("/")
+
+        if path == "/__library":
+            self.send_json(200, self.server.library.observed_series(self.server.scraper_base))
+            return
+        if path == "/__stats":
+            with self.server.stats_lock:
+                self.send_json(200, self.server.stats)
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if path.startswith("/series/"):
+            self.serve_scraper_page(path)
+            return
+
+        allowed, remaining, retry_at = self.server.limiter.check(self.client_address[0])
+        headers = {
+            "X-RateLimit-Limit": str(self.server.limiter.limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Retry-After": str(int(retry_at)),
+        }
+        if not allowed:
+            headers["Retry-After"] = str(max(1, int(retry_at - time.time()) + 1))
+            self.count("rate_limited", 429)
+            self.send_json(429, {"result": "error", "errors": [{"status": 429}]}, headers)
+            return
+
+        with self.server.library.lock:
+            kind, status, body = self.route(path, query)
+        self.count(kind, status)
+        self.send_json(status, body, headers)
+
+    # --- API ---
+
+    def route(self, path, query):
+        library = self.server.library
+        includes = query.get("includes[]", [])
+        limit = int(query.get("limit", ["10"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+
+        if path == "/manga":
+            if "ids[]" in query:
+                ids = [mid for mid in query["ids[]"] if mid in library.series]
+                data = [library.manga_json(mid, includes) for mid in ids[:limit]]
+                return "manga_batch", 200, listing(data, len(ids), limit, offset)
+            title = query.get("title", [""])[0].lower()
+            ids = [mid for mid, s in library.series.items() if title in s["title"].lower()]
+            data = [library.manga_json(mid, includes) for mid in ids[offset:offset + limit]]
+            return "manga_search", 200, listing(data, len(ids), limit, offset)
+
+        if path.startswith("/manga/") and path.endswith("/feed"):
+            manga_id = path.split("/")[2]
+            if manga_id not in library.series:
+                return "manga_feed", 404, {"result": "error"}
+            chapters = library.series[manga_id]["chapters"]
+            since = query.get("createdAtSince", [None])[0]
+            if since:
+                chapters = [c for c in chapters if c["created_at"][:19] >= since]
+            if query.get("order[publishAt]") == ["desc"] or query.get("order[createdAt]") == ["desc"]:
+                chapters = chapters[::-1]
+            data = [library.chapter_json(c, includes) for c in chapters[offset:offset + limit]]
+            return "manga_feed", 200, listing(data, len(chapters), limit, offset)
+
+        if path.startswith("/manga/"):
+            manga_id = path.split("/")[2]
+            if manga_id not in library.series:
+                return "manga", 404, {"result": "error"}
+            return "manga", 200, {"result": "ok", "data": library.manga_json(manga_id, includes)}
+
+        if path == "/chapter":
+            if "ids[]" in query:
+                chapters = [library.chapters[cid] for cid in query["ids[]"] if cid in library.chapters]
+                data = [library.chapter_json(c, includes) for c in chapters[:limit]]
+                return "chapter_batch", 200, listing(data, len(chapters), limit, offset)
+            if "manga" in query:
+                series = library.series.get(query["manga"][0])
+                chapters = series["chapters"][::-1] if series else []
+                data = [library.chapter_json(c, includes) for c in chapters[offset:offset + limit]]
+                return "chapter_latest", 200, listing(data, len(chapters), limit, offset)
+            since = query.get("createdAtSince", [""])[0]
+            start = bisect.bisect_left(library.by_created, (since, ""))
+            matching = library.by_created[start:]
+            data = [
+                library.chapter_json(library.chapters[cid], includes)
+                for _, cid in matching[offset:offset + limit]
+            ]
+            return "chapter_feed", 200, listing(data, len(matching), limit, offset)
+
+        return "unknown", 404, {"result": "error"}
+
+    # --- Scraper pages ---
+
+    def serve_scraper_page(self, path):
+        manga_id = path.split("/")[2]
+        library = self.server.library
+        with library.lock:
+            series = library.series.get(manga_id)
+            latest = int(series["chapters"][-1]["number"]) if series else None
+        if series is None:
+            self.count("scraper_page", 404)
+            self.send_json(404, {"result": "error"})
+            return
+
+        etag = f'"{manga_id[:8]}-{latest}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.count("scraper_page", 304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        rows = "\n".join(
+            f'      <li><a href="/series/{manga_id}/chapter-{n}">Chapter {n}</a>'
+            f'<span class="date">{n} days ago</span></li>'
+            for n in range(latest, max(0, latest - PAGE_CHAPTERS), -1)
+        )
+        body = self.server.page_template.replace("{title}", series["title"]).replace("{chapters}", rows)
+        data = body.encode()
+        self.count("scraper_page", 200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def listing(data, total, limit, offset):
+    return {"result": "ok", "response": "collection", "data": data,
+            "limit": limit, "offset": offset, "total": total}
+
+
+def make_server(size, port=0, rate_limit=300, window=60, error_rate=0.0, latency=0.0,
+                scraper_host="localhost", seed=1):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    server.daemon_threads = True
+    server.library = Library(size, seed=seed)
+    server.limiter = RateLimiter(rate_limit, window, error_rate)
+    server.latency = latency
+    server.scraper_base = f"http://{scraper_host}:{server.server_address[1]}"
+    server.stats = {"requests": 0, "by_endpoint": {}, "by_status": {}}
+    server.stats_lock = threading.Lock()
+    with open(PAGE_TEMPLATE, encoding="utf-8") as f:
+        server.page_template = f.read()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local MangaDex + scraper stand-in")
+    parser.add_argument("--size", type=int, default=1000, help="series in the synthetic library")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--rate-limit", type=int, default=300, help="requests per window per client")
+    parser.add_argument("--window", type=float, default=60, help="rate-limit window in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of API requests answered 429 at random")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = make_server(args.size, args.port, args.rate_limit, args.window,
+                         args.error_rate, args.latency, seed=args.seed)
+    # the runner reads the port from this line
+    print(f"listening {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+# Import time and RSS of the tracker's entry points, each measured in a
+# fresh interpreter (best of --repeat runs), as JSON:
+#
+#   python benchmarks/startup.py --output startup.json
+#
+# Also lists which heavy packages each import pulls in, so a module-level
+# import of discord or bs4 creeping back into the core shows up.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# module -> what it stands for
+ENTRY_POINTS = {
+    "mangadex_tracker": "core tracker",
+    "worker": "headless worker",
+    "async_tracker": "async tracker",
+    "discord_bot": "Discord bot",
+}
+HEAVY_PACKAGES = ["discord", "aiohttp", "bs4", "soupsieve", "lxml", "selectolax", "http.server"]
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+except ImportError:
+    rss = None
+print(json.dumps({{
+    "import_seconds": round(elapsed, 4),
+    "peak_rss_mb": rss,
+    "modules": len(sys.modules),
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(module, repeat):
+    runs = []
+    env = {**os.environ, "PYTHONPATH": REPO_DIR, "METRICS_PORT": "0"}
+    # a scratch directory, so nothing reads or creates state files in the repo
+    workdir = tempfile.mkdtemp(prefix="mangadex_startup_")
+    for _ in range(repeat):
+        probe = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+            cwd=workdir, env=env, capture_output=True, text=True,
+        )
+        if probe.returncode != 0:
+            return {"error": probe.stderr.strip().splitlines()[-1] if probe.stderr.strip() else "failed"}
+        runs.append(json.loads(probe.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run["import_seconds"])
+    return {**best, "runs": [run["import_seconds"] for run in runs]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and RSS of the tracker entry points")
+    parser.add_argument("--modules", nargs="+", default=list(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "entry_points": {
+            module: {"description": ENTRY_POINTS.get(module, module), **measure(module, args.repeat)}
+            for module in args.modules
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ Wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
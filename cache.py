@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Metadata cache for MangaDex lookups that rarely change (manga info,
+# covers, search results). Entries expire per data type, the in-memory tier
+# evicts least recently used entries past a size cap, an optional SQLite
+# tier keeps entries across restarts, and concurrent lookups of the same
+# key share one fetch.
+
+CACHE_FILE = os.getenv("METADATA_CACHE_FILE", "metadata_cache.db")
+# set to 0 to keep the cache in memory only
+CACHE_ON_DISK = os.getenv("METADATA_CACHE_DISK", "1") != "0"
+CACHE_MAX_BYTES = int(os.getenv("METADATA_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# seconds per namespace
+CACHE_TTLS = {
+    "manga_info": 6 * 60 * 60,
+    "cover": 7 * 24 * 60 * 60,
+    "search": 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+MISSING = object()
+
+
+class MetadataCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_path=None):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # (namespace, key) -> (expires_at, size, value)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.inflight = {}             # (namespace, key) -> threading.Event
+        self.async_inflight = {}       # (namespace, key) -> asyncio.Future
+        self.disk = None
+        if disk_path:
+            self.disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self.disk.execute("PRAGMA journal_mode=WAL")
+            self.disk.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace  TEXT NOT NULL,
+                    key        TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    value      TEXT NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+
+    # --- Plain get/set ---
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end((namespace, key))
+                    return entry[2]
+                self._drop((namespace, key))
+
+            if self.disk is None:
+                return MISSING
+            row = self.disk.execute(
+                "SELECT expires_at, value FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or row[0] <= now:
+                return MISSING
+            value = json.loads(row[1])
+            self._store(namespace, key, row[0], value, len(row[1]))
+            return value
+
+    def set(self, namespace, key, value, ttl=None):
+        ttl = CACHE_TTLS.get(namespace, DEFAULT_TTL) if ttl is None else ttl
+        expires_at = time.time() + ttl
+        encoded = json.dumps(value)
+        with self.lock:
+            self._store(namespace, key, expires_at, value, len(encoded))
+            if self.disk is not None:
+                with self.disk:
+                    self.disk.execute(
+                        "INSERT OR REPLACE INTO cache (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+                        (namespace, key, expires_at, encoded),
+                    )
+
+    def invalidate(self, namespace, key):
+        with self.lock:
+            self._drop((namespace, key))
+            if self.disk is not None:
+                with self.disk:
+                    self.disk.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+                    )
+
+    def purge_expired(self):
+        if self.disk is not None:
+            with self.lock, self.disk:
+                self.disk.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    # --- Fetch-through with request coalescing ---
+
+    def get_or_fetch(self, namespace, key, fetch, ttl=None):
+        """
+        Cached value, or the result of fetch() stored for next time. Threads
+        asking for the same key while a fetch is running wait for it instead
+        of fetching again. Exceptions from fetch() propagate and aren't cached.
+        """
+        while True:
+            value = self.get(namespace, key)
+            if value is not MISSING:
+                return value
+
+            with self.lock:
+                event = self.inflight.get((namespace, key))
+                if event is None:
+                    event = self.inflight[(namespace, key)] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                event.wait()
+                continue  # the owner's result is in the cache now (unless it failed)
+
+            try:
+                value = fetch()
+                self.set(namespace, key, value, ttl)
+                return value
+            finally:
+                with self.lock:
+                    self.inflight.pop((namespace, key), None)
+                event.set()
+
+    async def aget_or_fetch(self, namespace, key, fetch, ttl=None):
+        """Async get_or_fetch: `fetch` is a coroutine function."""
+        value = self.get(namespace, key)
+        if value is not MISSING:
+            return value
+
+        future = self.async_inflight.get((namespace, key))
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.async_inflight[(namespace, key)] = future
+        try:
+            value = await fetch()
+            self.set(namespace, key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self.async_inflight.pop((namespace, key), None)
+
+    # --- LRU bookkeeping (lock held) ---
+
+    def _store(self, namespace, key, expires_at, value, size):
+        self._drop((namespace, key))
+        self.entries[(namespace, key)] = (expires_at, size, value)
+        self.size += size
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, (_, old_size, _) = self.entries.popitem(last=False)
+            self.size -= old_size
+
+    def _drop(self, cache_key):
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = MetadataCache(disk_path=CACHE_FILE if CACHE_ON_DISK else None)
+        _cache.purge_expired()
+    return _cache
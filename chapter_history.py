@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import threading
+import time
+from chapter_set import parse_chapter_number
+
+# Local copy of each tracked series' English chapters (ids, numbers,
+# volumes, publish times), so /unread, /latest and the mark-read buttons
+# work from real chapter records. Each series is synced from
+# /manga/{id}/feed in createdAt order and remembers the newest createdAt
+# it has stored, so the next sync (or one resumed after a failure) only
+# asks for what was added since.
+
+HISTORY_FILE = os.getenv("CHAPTER_HISTORY_FILE", "chapter_history.db")
+# MangaDex caps /manga/{id}/feed at 500 chapters per page
+HISTORY_PAGE_SIZE = 500
+# re-sync a series' history at least this often (seconds)
+HISTORY_MAX_AGE = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    chapter_id  TEXT PRIMARY KEY,
+    manga_id    TEXT NOT NULL,
+    number      TEXT,   -- as MangaDex has it: "12", "10.5", NULL for oneshots
+    number_sort REAL,
+    volume      TEXT,
+    title       TEXT,
+    publish_at  TEXT,
+    created_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chapters_manga ON chapters (manga_id, number_sort);
+
+CREATE TABLE IF NOT EXISTS history_sync (
+    manga_id        TEXT PRIMARY KEY,
+    last_created_at TEXT,   -- resume point for createdAtSince
+    synced_at       REAL
+);
+"""
+
+CHAPTER_FIELDS = ("chapter_id", "manga_id", "number", "volume", "title", "publish_at", "created_at")
+
+
+class ChapterHistory:
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    # --- Writes ---
+
+    def record(self, chapters, manga_id=None):
+        """
+        Store chapter entries from /chapter or /manga/{id}/feed. Without
+        manga_id the series is read from each chapter's relationships.
+        Returns how many entries were stored.
+        """
+        rows = []
+        for chapter in chapters:
+            mid = manga_id or next(
+                (rel["id"] for rel in chapter.get("relationships", []) if rel.get("type") == "manga"),
+                None,
+            )
+            if mid is None:
+                continue
+            attrs = chapter["attributes"]
+            number = parse_chapter_number(attrs.get("chapter"))
+            rows.append((
+                chapter["id"], mid, attrs.get("chapter"),
+                number,
+                attrs.get("volume"), attrs.get("title"),
+                attrs.get("publishAt"), attrs.get("createdAt"),
+            ))
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO chapters
+                    (chapter_id, manga_id, number, number_sort, volume, title, publish_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def save_sync(self, manga_id, last_created_at=None):
+        """Move the series' resume point forward (if given) and note when it was synced."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO history_sync (manga_id, last_created_at, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT (manga_id) DO UPDATE SET
+                    last_created_at = COALESCE(excluded.last_created_at, last_created_at),
+                    synced_at = excluded.synced_at
+                """,
+                (manga_id, last_created_at, time.time()),
+            )
+
+    def forget(self, manga_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM chapters WHERE manga_id = ?", (manga_id,))
+            self.conn.execute("DELETE FROM history_sync WHERE manga_id = ?", (manga_id,))
+
+    # --- Reads ---
+
+    def sync_cursor(self, manga_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_created_at FROM history_sync WHERE manga_id = ?", (manga_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stale(self, manga_ids, limit, first=(), max_age=HISTORY_MAX_AGE):
+        """
+        Up to `limit` of manga_ids whose history should be synced: ids in
+        `first`, then never-synced ones, then the longest-unsynced past max_age.
+        """
+        with self.lock:
+            synced = dict(self.conn.execute("SELECT manga_id, synced_at FROM history_sync"))
+        cutoff = time.time() - max_age
+        candidates = [
+            mid for mid in manga_ids
+            if mid in first or synced.get(mid) is None or synced[mid] < cutoff
+        ]
+        candidates.sort(key=lambda mid: (mid not in first, synced.get(mid) or 0))
+        return candidates[:limit]
+
+    def chapter_numbers(self, manga_id):
+        """Distinct chapter numbers (parsed, ascending) of a series."""
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT DISTINCT number_sort FROM chapters
+                WHERE manga_id = ? AND number_sort IS NOT NULL ORDER BY number_sort
+                """,
+                (manga_id,),
+            ).fetchall()
+        return [parse_chapter_number(row[0]) for row in rows]
+
+    def latest(self, manga_id):
+        """The highest-numbered chapter (newest upload among scanlations), or None."""
+        with self.lock:
+            row = self.conn.execute(
+                f"""
+                SELECT {', '.join(CHAPTER_FIELDS)} FROM chapters
+                WHERE manga_id = ? AND number_sort IS NOT NULL
+                ORDER BY number_sort DESC, created_at DESC LIMIT 1
+                """,
+                (manga_id,),
+            ).fetchone()
+        return dict(zip(CHAPTER_FIELDS, row)) if row else None
+
+    def get(self, chapter_id):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(CHAPTER_FIELDS)} FROM chapters WHERE chapter_id = ?",
+                (chapter_id,),
+            ).fetchone()
+        return dict(zip(CHAPTER_FIELDS, row)) if row else None
+
+
+_history = None
+
+
+def get_chapter_history():
+    global _history
+    if _history is None:
+        _history = ChapterHistory()
+    return _history
@@ -0,0 +1,146 @@
+import bisect
+import re
+
+# Compact set of chapter numbers for read-state tracking. Whole chapters are
+# kept as sorted, non-overlapping [start, end] runs, so "read 1-1100" is a
+# single entry; fractional chapters like 10.5 live in a small sorted side
+# list. Serialized as a list of strings ("1-500", "502", "10.5"), which is
+# still a plain list in observed_series.json.
+
+# what add_item accepts: a chapter ("12", "10.5") or a range of whole chapters ("1-500")
+CHAPTER_ITEM = re.compile(r"\d+(?:\.\d+)?|\d+-\d+")
+
+
+def parse_chapter_number(value):
+    """'12' / '12.0' / 12.0 -> 12, '10.5' -> 10.5, anything else -> None."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number or number in (float("inf"), float("-inf")):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+class ChapterSet:
+    __slots__ = ("starts", "ends", "fractions")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.fractions = []
+
+    # --- Serialization ---
+
+    @classmethod
+    def from_list(cls, items):
+        chapters = cls()
+        for item in items or []:
+            try:
+                chapters.add_item(item)
+            except ValueError:
+                print(f"⚠️ Skipping invalid read chapter entry {item!r}")
+        return chapters
+
+    def to_list(self):
+        items = []
+        for start, end in zip(self.starts, self.ends):
+            items.append(str(start) if start == end else f"{start}-{end}")
+        items.extend(str(f) for f in self.fractions)
+        return items
+
+    # --- Queries ---
+
+    def __contains__(self, value):
+        number = parse_chapter_number(value)
+        if number is None:
+            return False
+        if isinstance(number, float):
+            i = bisect.bisect_left(self.fractions, number)
+            return i < len(self.fractions) and self.fractions[i] == number
+        i = bisect.bisect_right(self.starts, number) - 1
+        return i >= 0 and self.ends[i] >= number
+
+    def __len__(self):
+        return sum(e - s + 1 for s, e in zip(self.starts, self.ends)) + len(self.fractions)
+
+    def __bool__(self):
+        return bool(self.starts or self.fractions)
+
+    def max(self):
+        candidates = []
+        if self.ends:
+            candidates.append(self.ends[-1])
+        if self.fractions:
+            candidates.append(self.fractions[-1])
+        return max(candidates) if candidates else None
+
+    def unread(self, chapters):
+        """The chapters (sorted ascending) not in this set, in one merge pass."""
+        result = []
+        run = 0
+        for value in chapters:
+            number = parse_chapter_number(value)
+            if number is None:
+                continue
+            if isinstance(number, float):
+                if number not in self:
+                    result.append(number)
+                continue
+            while run < len(self.ends) and self.ends[run] < number:
+                run += 1
+            if run >= len(self.starts) or self.starts[run] > number:
+                result.append(number)
+        return result
+
+    # --- Updates ---
+
+    def add(self, value):
+        """Add one chapter; returns False if it was already there."""
+        number = parse_chapter_number(value)
+        if number is None or number in self:
+            return False
+        if isinstance(number, float):
+            bisect.insort(self.fractions, number)
+        else:
+            self.add_range(number, number)
+        return True
+
+    def add_item(self, item):
+        """
+        Add a serialized entry or user input: '12', '10.5' or '1-500'.
+        Returns True if anything was new; raises ValueError for anything else.
+        """
+        text = str(item).strip()
+        if not CHAPTER_ITEM.fullmatch(text):
+            raise ValueError(f"invalid chapter: {text!r}")
+        start, sep, end = text.partition("-")
+        if sep:
+            first, last = int(start), int(end)
+            before = len(self)
+            self.add_range(first, last)
+            return len(self) != before
+        return self.add(text)
+
+    def add_range(self, start, end):
+        """Add every whole chapter from start to end inclusive."""
+        if end < start:
+            start, end = end, start
+        # runs that overlap or touch [start, end] get merged into one
+        lo = bisect.bisect_left(self.ends, start - 1)
+        hi = bisect.bisect_right(self.starts, end + 1)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+
+def format_chapter_runs(chapters):
+    """Short display form of a chapter list: '1-5, 7, 7.5, 10'."""
+    chapter_set = ChapterSet()
+    for chapter in chapters:
+        chapter_set.add(chapter)
+    items = chapter_set.to_list()
+    items.sort(key=lambda item: float(item.split("-")[0]))
+    return ", ".join(items)
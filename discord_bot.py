@@ -1,10 +1,16 @@
 import discord
 import os
 import asyncio
-import requests
+import aiohttp
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
+import async_tracker
+import metrics
+from poll_scheduler import PollScheduler
+from notification_queue import NotificationQueue
+from chapter_history import get_chapter_history
+from profiling import CycleProfiler
 from mangadex_tracker import (
     load_observed_series,
     remove_series_by_title,
@@ -12,12 +18,24 @@ from mangadex_tracker import (
     save_observed_series,
     show_latest_chapter,
     search_manga_title,
-    show_manga_info,
-    check_for_updates,
     search_manga_titles_for_tracking,
     finalize_tracking,
+    fetch_new_series,
     confirm_remove_by_index,
+    find_series_by_title,
+    mark_chapters_read,
+    list_unread_chapters,
+    resolve_read_button,
+    missing_covers,
+    fetch_manga_covers,
+    apply_covers,
+    missing_alt_titles,
+    fetch_manga_alt_titles,
+    apply_alt_titles,
 )
+from chapter_set import format_chapter_runs
+from manga_scraper import chapter_regex_error
+from subscriptions import subscriber_key, visible_to
 
 #
 load_dotenv()
@@ -26,31 +44,102 @@ user_pending_searches = {}
 user_pending_removals = {}
 
 GUILD = 1326213967642628096
+# Where series without subscribers (tracked before subscriptions) are announced
+DEFAULT_CHANNEL_ID = 1326213968527753340
+
+# Seconds between polling ticks
+POLL_TICK = 300
+# Scraper/history requests the scheduler may spend per tick
+CYCLE_REQUEST_BUDGET = int(os.getenv("CYCLE_REQUEST_BUDGET", "60"))
+# Series whose chapter history is brought up to date per tick
+HISTORY_SYNCS_PER_TICK = int(os.getenv("HISTORY_SYNCS_PER_TICK", "5"))
 
 intents = discord.Intents.default()
 client = discord.Client(intents=intents)
 tree = app_commands.CommandTree(client)
 
 observed_series = load_observed_series()
+notifications = None  # NotificationQueue, created once the client is ready
+profile_lock = asyncio.Lock()  # cProfile allows one active profiler
 
 
 async def start_polling(channel):
     await channel.send("👀 Manga tracker is watching for updates...")
+    scheduler = PollScheduler()
 
     while True:
         print("🔄 Checking for chapter updates...")
-        observed_series = load_observed_series()
-        messages = check_for_updates(observed_series, return_messages=True)
+        with metrics.timer("tracker_poll_tick_duration_seconds"):
+            try:
+                await poll_tick(scheduler)
+            except Exception as e:
+                # one bad tick must not stop polling for good
+                print(f"❌ Poll tick failed: {e!r}")
+        await asyncio.sleep(POLL_TICK)
+
+
+async def poll_tick(scheduler):
+    # use the shared in-memory state: with coalesced writes the file
+    # on disk can lag slightly behind it
+
+    # MangaDex is covered by the incremental feed every tick; the
+    # scheduler decides which optional scrapers are worth a request now
+    scraper_ids = [
+        mid for mid, data in observed_series.items()
+        if (data.optional_scraper or {}).get("check_url")
+    ]
+    scheduler.sync(scraper_ids)
+    due = scheduler.pop_due(CYCLE_REQUEST_BUDGET)
+
+    learn = [mid for mid in due if scheduler.needs_history(mid)]
+    histories = await asyncio.gather(*(async_tracker.get_release_history(mid) for mid in learn))
+    for mid, (release_times, status) in zip(learn, histories):
+        scheduler.set_history(mid, release_times, status)
+
+    last_seen = {mid: data.last_chapter_number for mid, data in observed_series.items()}
+    deferred = set()
+    # updates go to the notification queue as each series is checked
+    await async_tracker.check_for_updates_incremental(
+        observed_series, scraper_ids=set(due), deferred=deferred,
+        on_message=notifications.enqueue,
+    )
+
+    for mid in scraper_ids:
+        if mid not in observed_series:
+            continue
+        found_new = observed_series[mid].last_chapter_number != last_seen.get(mid)
+        if mid in deferred and not found_new:
+            # ran out of time: first in line next cycle, no miss counted
+            scheduler.defer(mid)
+        elif found_new or mid in due:
+            scheduler.record(mid, found_new)
+    scheduler.save()
+
+    # series with new chapters first, then never-synced and stale ones
+    updated = {
+        mid for mid, data in observed_series.items()
+        if data.last_chapter_number != last_seen.get(mid)
+    }
+    await sync_histories(get_chapter_history().stale(
+        list(observed_series), HISTORY_SYNCS_PER_TICK, first=updated
+    ))
+
+
+
+async def sync_histories(manga_ids):
+    for mid in manga_ids:
+        try:
+            stored = await async_tracker.sync_chapter_history(mid)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Chapter history sync failed for {mid}: {e}")
+            continue
+        if stored:
+            print(f"📚 Synced {stored} chapters for {observed_series.get(mid, {}).get('title', mid)}")
 
-        for msg in messages:
-            if isinstance(msg, tuple):
-                embed, view = msg  # unpack the tuple
-                await channel.send(embed=embed, view=view)
-            else:
-                await channel.send(msg)
 
+def subscriber_of(interaction):
+    return subscriber_key(interaction.guild_id, interaction.user.id)
 
-        await asyncio.sleep(1800)
 
 #Events
 
@@ -70,15 +159,22 @@ async def on_ready():
         print(f"❌ Failed to sync commands: {e}")
 
     # Find your channel
-    channel = client.get_channel(1326213968527753340)
+    channel = client.get_channel(DEFAULT_CHANNEL_ID)
     if not channel:
-        channel = await client.fetch_channel(1326213968527753340)
+        channel = await client.fetch_channel(DEFAULT_CHANNEL_ID)
     if not channel:
         print("❌ Could not find channel")
         return
 
     await channel.send("✅ MangaDex bot is online!")
-    client.loop.create_task(start_polling(channel))
+
+    # on_ready fires again after reconnects; only start the loops once
+    global notifications
+    if notifications is None:
+        notifications = NotificationQueue(client, DEFAULT_CHANNEL_ID)
+        notifications.start()
+        metrics.serve()
+        client.loop.create_task(start_polling(channel))
 
 
 
@@ -89,15 +185,28 @@ async def on_interaction(interaction):
     if interaction.type == discord.InteractionType.component:
         custom_id = interaction.data.get("custom_id")
         if custom_id and custom_id.startswith("markread_"):
-            _, manga_id, chapter_number = custom_id.split("_")
+            # markread_{manga_id}_{chapter_id or number}[_{number}]
+            _, manga_id, *chapter_refs = custom_id.split("_")
             info = observed_series.get(manga_id)
-            if info:
-                read = info.setdefault("read_chapters", [])
-                if chapter_number not in read:
-                    read.append(chapter_number)
-                    save_observed_series(observed_series)
+            chapter_number = resolve_read_button(manga_id, *chapter_refs) if info else None
+            if info and chapter_number is None:
+                await interaction.response.send_message(
+                    f"⚠️ That chapter of {info.title} isn't in the chapter history yet.", ephemeral=True
+                )
+            elif info and not visible_to(info, subscriber_of(interaction)):
+                await interaction.response.send_message(
+                    f"⚠️ You're not subscribed to {info.title}.", ephemeral=True
+                )
+            elif info:
+                try:
+                    mark_chapters_read(observed_series, manga_id, chapter_number, subscriber_of(interaction))
+                except ValueError:
+                    await interaction.response.send_message(
+                        f"❌ Invalid chapter '{chapter_number}'.", ephemeral=True
+                    )
+                    return
                 await interaction.response.send_message(
-                    f"✅ Chapter {chapter_number} marked as read for {info['title']}",
+                    f"✅ Chapter {chapter_number} marked as read for {info.title}",
                     ephemeral=True
                 )
 
@@ -110,7 +219,8 @@ async def on_interaction(interaction):
 async def track(interaction: discord.Interaction, title: str):
     await interaction.response.defer(thinking=True)  # ⏳ Gives you more time
 
-    message, choices = search_manga_titles_for_tracking(title)
+    # blocking MangaDex calls (rate limits, retries) run off the event loop
+    message, choices = await asyncio.to_thread(search_manga_titles_for_tracking, title)
     if choices:
         user_pending_searches[interaction.user.id] = choices
 
@@ -134,28 +244,34 @@ async def select(interaction: discord.Interaction, number: int):
         await interaction.response.send_message("❌ Invalid selection.")
         return
 
-    # Finalize MangaDex tracking
-    message = finalize_tracking(index, choices, observed_series)
+    await interaction.response.defer(thinking=True)
 
-    # Ensure optional_scraper exists but empty
+    # Finalize MangaDex tracking (or just subscribe if it's already tracked)
+    # (only the MangaDex lookups leave the loop; observed_series is changed here)
+    subscriber = (interaction.guild_id, interaction.channel_id, interaction.user.id)
     selected_title, selected_id, _ = choices[index]
-    if "optional_scraper" not in observed_series[selected_id]:
-        observed_series[selected_id]["optional_scraper"] = {
+    fetched = None
+    if selected_id not in observed_series:
+        fetched = await asyncio.to_thread(fetch_new_series, selected_id)
+    message = finalize_tracking(index, choices, observed_series, subscriber, fetched)
+
+    # Ensure optional_scraper exists but empty
+    if selected_id in observed_series and observed_series[selected_id].optional_scraper is None:
+        observed_series[selected_id].optional_scraper = {
             "check_url": None,
             "check_selector": None,
             "read_url_template": None
         }
-        from mangadex_tracker import save_observed_series
-        save_observed_series(observed_series)
+        save_observed_series(observed_series, selected_id)
 
-    await interaction.response.send_message(message)
+    await interaction.followup.send(message)
     user_pending_searches.pop(interaction.user.id, None)
 
 
 @tree.command(name="untrack", description="Untrack a manga by title")
 @app_commands.describe(title="Title of the manga to stop tracking")
 async def untrack(interaction: discord.Interaction, title: str):
-    result = remove_series_by_title(title, observed_series)
+    result = remove_series_by_title(title, observed_series, subscriber_of(interaction))
     if isinstance(result, str):
         await interaction.response.send_message(result)
     else:
@@ -175,14 +291,14 @@ async def confirm_remove(interaction: discord.Interaction, index: int):
         )
         return
 
-    message = confirm_remove_by_index(index - 1, options, observed_series)
+    message = confirm_remove_by_index(index - 1, options, observed_series, subscriber_of(interaction))
     await interaction.response.send_message(message)
     user_pending_removals.pop(interaction.user.id, None)
 
 
 @tree.command(name="list", description="List all tracked manga")
 async def list_tracked(interaction: discord.Interaction):
-    message = list_tracked_series(observed_series)
+    message = list_tracked_series(observed_series, subscriber_of(interaction))
     await interaction.response.send_message(message)
 
 
@@ -196,15 +312,17 @@ async def latest(interaction: discord.Interaction, title: str):
 @tree.command(name="search", description="Search MangaDex for a manga")
 @app_commands.describe(title="Title to search for on MangaDex")
 async def search(interaction: discord.Interaction, title: str):
-    message = search_manga_title(title)
-    await interaction.response.send_message(message)
+    await interaction.response.defer(thinking=True)
+    message = await asyncio.to_thread(search_manga_title, title)
+    await interaction.followup.send(message)
 
 
 @tree.command(name="info", description="Show info for a tracked manga")
 @app_commands.describe(title="Title of the tracked manga")
 async def info(interaction: discord.Interaction, title: str):
-    message = show_manga_info(title, observed_series)
-    await interaction.response.send_message(message)
+    await interaction.response.defer(thinking=True)
+    message = await async_tracker.show_manga_info(title, observed_series)
+    await interaction.followup.send(message)
 
 
 @tree.command(
@@ -214,7 +332,7 @@ async def recheck(interaction: discord.Interaction):
     await interaction.response.send_message(
         "🔄 Manually checking for chapter updates..."
     )
-    check_for_updates(observed_series, return_messages=True)
+    await async_tracker.check_for_updates(observed_series, on_message=notifications.enqueue)
     await interaction.followup.send("✅ Recheck complete")
 
 @tree.command(name="configure", description="Configure optional scraper for a tracked manga")
@@ -222,29 +340,49 @@ async def recheck(interaction: discord.Interaction):
     title="Title of the tracked manga",
     check_url="URL to check for latest chapter",
     check_selector="CSS selector to find latest chapter",
-    read_url_template="Template URL to read the chapter, use {} for chapter number"
+    read_url_template="Template URL to read the chapter, use {} for chapter number",
+    parser="HTML parser: html.parser (default), lxml or selectolax",
+    chapter_regex="Regex with one group capturing the chapter number (default: first number)",
+    early_exit="Stop parsing at the first match (lxml only)",
 )
+@app_commands.choices(parser=[
+    app_commands.Choice(name="html.parser", value="html.parser"),
+    app_commands.Choice(name="lxml", value="lxml"),
+    app_commands.Choice(name="selectolax", value="selectolax"),
+])
 async def configure(
     interaction: discord.Interaction,
     title: str,
     check_url: str,
     check_selector: str,
-    read_url_template: str
+    read_url_template: str,
+    parser: app_commands.Choice[str] = None,
+    chapter_regex: str = None,
+    early_exit: bool = False,
 ):
+    if chapter_regex and (error := chapter_regex_error(chapter_regex)):
+        await interaction.response.send_message(f"❌ chapter_regex {error}.")
+        return
+
     # Find the manga in observed_series
-    for mid, info in observed_series.items():
-        if title.lower() in info["title"].lower():
-            info["optional_scraper"] = {
-                "check_url": check_url,
-                "check_selector": check_selector,
-                "read_url_template": read_url_template
-            }
-            from mangadex_tracker import save_observed_series
-            save_observed_series(observed_series)
-            await interaction.response.send_message(
-                f"✅ Optional scraper configured for **{info['title']}**."
-            )
-            return
+    for mid, info in find_series_by_title(title, observed_series):
+        config = {
+            "check_url": check_url,
+            "check_selector": check_selector,
+            "read_url_template": read_url_template
+        }
+        if parser:
+            config["parser"] = parser.value
+        if chapter_regex:
+            config["chapter_regex"] = chapter_regex
+        if early_exit:
+            config["early_exit"] = True
+        info.optional_scraper = config
+        save_observed_series(observed_series, mid)
+        await interaction.response.send_message(
+            f"✅ Optional scraper configured for **{info.title}**."
+        )
+        return
 
     await interaction.response.send_message(f"❌ No tracked series found matching '{title}'.")
 
@@ -252,92 +390,92 @@ async def configure(
 @app_commands.describe(title="Title of the tracked manga")
 async def unread(interaction: discord.Interaction, title: str):
 
-    for mid, info in observed_series.items():
-        if title.lower() in info["title"].lower():
-
-            last_number = float(info.get("last_chapter_number", 0))
-
-            # Convert read_chapters to floats safely
-            read_raw = info.get("read_chapters", [])
-            read = []
-            for x in read_raw:
-                try:
-                    read.append(float(x))
-                except:
-                    pass
-
-            max_read = max(read) if read else 0  # default = nothing read
-
-            # Determine unread range
-            start = int(max_read) + 1
-            end = int(last_number)
-
-            if start > end:
-                await interaction.response.send_message(
-                    f"✅ All chapters read for **{info['title']}**"
-                )
-                return
-
-            unread_chapters = list(range(start, end + 1))
+    key = subscriber_of(interaction)
+    for mid, info in find_series_by_title(title, observed_series):
+        if not visible_to(info, key):
+            continue
+        unread_chapters = list_unread_chapters(mid, info, key)
 
+        if not unread_chapters:
             await interaction.response.send_message(
-                f"📘 **Unread chapters for {info['title']}:** {', '.join(str(c) for c in unread_chapters)}"
+                f"✅ All chapters read for **{info.title}**"
             )
             return
 
+        await interaction.response.send_message(
+            f"📘 **Unread chapters for {info.title}:** {format_chapter_runs(unread_chapters)}"
+        )
+        return
+
     await interaction.response.send_message(
         f"❌ No tracked series found matching '{title}'"
     )
 
 
 @tree.command(name="mark_read", description="Mark a chapter as read")
-@app_commands.describe(title="Title of the tracked manga", chapter="Chapter number to mark as read")
+@app_commands.describe(
+    title="Title of the tracked manga",
+    chapter="Chapter number to mark as read, or a range like 1-500",
+)
 async def mark_read(interaction: discord.Interaction, title: str, chapter: str):
-    for mid, info in observed_series.items():
-        if title.lower() in info["title"].lower():
-            read = info.setdefault("read_chapters", [])
-            if chapter not in read:
-                read.append(chapter)
-                from mangadex_tracker import save_observed_series
-                save_observed_series(observed_series)
-                await interaction.response.send_message(f"✅ Chapter {chapter} marked as read for {info['title']}")
-            else:
-                await interaction.response.send_message(f"⚠️ Chapter {chapter} was already marked as read.")
+    key = subscriber_of(interaction)
+    for mid, info in find_series_by_title(title, observed_series):
+        if not visible_to(info, key):
+            continue
+        try:
+            marked = mark_chapters_read(observed_series, mid, chapter, key)
+        except ValueError:
+            await interaction.response.send_message(
+                f"❌ Invalid chapter '{chapter}'. Use a number like 12 or 10.5, or a range like 1-500."
+            )
             return
+        if marked:
+            await interaction.response.send_message(f"✅ Chapter {chapter} marked as read for {info.title}")
+        else:
+            await interaction.response.send_message(f"⚠️ Chapter {chapter} was already marked as read.")
+        return
 
     await interaction.response.send_message(f"❌ No tracked series found matching '{title}'")
 
-@tree.command(name="update", description="Update missing info (like cover images) for all tracked manga")
-async def update(interaction: discord.Interaction):
-    await interaction.response.defer(thinking=True)
-    updated_count = 0
+@tree.command(name="stats", description="Show poller timings, request counts and queue depth")
+async def stats(interaction: discord.Interaction):
+    await interaction.response.send_message(metrics.format_stats(), ephemeral=True)
 
-    for manga_id, series_data in observed_series.items():
-        # Check if cover_url is missing or empty
-        if not series_data.get("cover_url"):
-            try:
-                manga_url = f"https://api.mangadex.org/manga/{manga_id}"
-                resp = requests.get(manga_url)
-                resp.raise_for_status()
-                manga_json = resp.json()
-                cover_file = None
 
-                for rel in manga_json["data"]["relationships"]:
-                    if rel["type"] == "cover_art":
-                        cover_file = rel["attributes"]["fileName"]
-                        break
+@tree.command(name="profile", description="Run one profiled update check and attach the report")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(full="Look up every series instead of using the incremental feed")
+async def profile(interaction: discord.Interaction, full: bool = False):
+    if profile_lock.locked():
+        await interaction.response.send_message("⚠️ A profiled check is already running.", ephemeral=True)
+        return
 
-                if cover_file:
-                    cover_url = f"https://uploads.mangadex.org/covers/{manga_id}/{cover_file}"
-                    series_data["cover_url"] = cover_url
-                    updated_count += 1
+    await interaction.response.defer(thinking=True, ephemeral=True)
+    check = async_tracker.check_for_updates if full else async_tracker.check_for_updates_incremental
+    # the profile covers everything on the event loop meanwhile, bot included
+    async with profile_lock:
+        with CycleProfiler(observed_series) as profiler:
+            await check(observed_series, on_message=notifications.enqueue)
+    await interaction.followup.send(
+        profiler.summary(),
+        files=[discord.File(path) for path in profiler.paths],
+        ephemeral=True,
+    )
 
-            except requests.RequestException as e:
-                print(f"❌ Failed to update {series_data.get('title', manga_id)}: {e}")
-                continue
 
-    save_observed_series(observed_series)
-    await interaction.followup.send(f"✅ Update complete! Added cover images to {updated_count} manga.")
+@tree.command(name="update", description="Update missing info (cover images, alternate titles) for all tracked manga")
+async def update(interaction: discord.Interaction):
+    await interaction.response.defer(thinking=True)
+    covers = await asyncio.to_thread(fetch_manga_covers, missing_covers(observed_series))
+    updated_count = apply_covers(observed_series, covers)
+    alt_titles = await asyncio.to_thread(fetch_manga_alt_titles, missing_alt_titles(observed_series))
+    alt_title_count = apply_alt_titles(observed_series, alt_titles)
+    await interaction.followup.send(
+        f"✅ Update complete! Added cover images to {updated_count} manga "
+        f"and alternate titles to {alt_title_count}."
+    )
 
 
-client.run(TOKEN)
+if __name__ == "__main__":
+    # guarded so the scraper's parse processes can import this module safely
+    client.run(TOKEN)
@@ -0,0 +1,51 @@
+from discord import ButtonStyle, Embed
+from discord.ui import Button, View
+
+# Discord presentation of tracker notifications. The tracker itself only
+# produces plain notification dicts (see
+# mangadex_tracker.evaluate_series_update); the bot turns them into embeds
+# and buttons here when it sends them, so the tracker runs without discord.
+
+
+def notification_embed(notification):
+    """The Discord embed for a notification from evaluate_series_update."""
+    if notification["secondary"]:
+        embed = Embed(
+            title=f"📢 New Chapter Released (Secondary Source)! {notification['title']}",
+            description=f"Chapter {notification['chapter']}",
+            color=0x00FF00
+        )
+    else:
+        embed = Embed(
+            title=f"📢 New Chapter Released! {notification['title']}",
+            description=f"Chapter {notification['chapter']}: {notification['chapter_title']}",
+            color=0x1ABC9C
+        )
+    if notification.get("cover_url"):
+        embed.set_image(url=notification["cover_url"])
+    return embed
+
+
+def notification_view(notifications):
+    """Jump/mark-read buttons for one or more notifications sent as one message."""
+    view = View(timeout=None)
+    seen = set()
+    for notification in notifications:
+        custom_id = f"markread_{notification['manga_id']}_{notification['chapter']}"
+        if notification.get("chapter_id"):
+            # the number stays as a fallback for chapters not in the history
+            custom_id = f"markread_{notification['manga_id']}_{notification['chapter_id']}_{notification['chapter']}"
+        if custom_id in seen:
+            continue
+        seen.add(custom_id)
+
+        # with several embeds in one message the buttons need to say which is which
+        suffix = "" if len(notifications) == 1 else f" · {notification['title'][:40]} {notification['chapter']}"
+        if notification.get("url"):
+            view.add_item(Button(label=f"📖 Jump to Chapter{suffix}", url=notification["url"]))
+        view.add_item(Button(
+            label=f"✅ Mark as Read{suffix}",
+            style=ButtonStyle.success,
+            custom_id=custom_id
+        ))
+    return view
@@ -0,0 +1,214 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+import requests
+from http_client import parse_retry_after
+
+# Politeness scheduler for optional scrapers. Jobs are grouped by host: each
+# host gets a concurrency limit and a minimum delay between request starts,
+# different hosts run in parallel, and a host that answers 403, 429 or 5xx or
+# times out is paused (with backoff) so its remaining jobs are skipped for
+# this cycle instead of stalling it. Errors in one series' own config (a
+# malformed URL or header) only fail that series.
+
+# concurrency, seconds between request starts
+HOST_POLITENESS = {
+    "asuracomic.net": (1, 2.0),
+    "www.toongod.org": (1, 2.0),
+    "toongod.org": (1, 2.0),
+}
+DEFAULT_POLITENESS = (2, 1.0)
+# upper bound on threads across all hosts
+MAX_WORKERS = 16
+
+# plus every 5xx
+PAUSE_STATUSES = {403, 429}
+PAUSE_BASE = 60.0
+PAUSE_MAX = 60 * 60.0
+
+
+class HostPausedError(Exception):
+    """Raised for jobs whose host is paused after recent failures."""
+
+
+class CycleDeadlineExceeded(Exception):
+    """Raised for jobs that couldn't start before the cycle's deadline."""
+
+
+def host_of(url):
+    return (urlsplit(url).hostname or "").lower()
+
+
+def host_failure_reason(exc):
+    """Why an exception should pause the whole host, or None if it's job-specific."""
+    if getattr(exc, "circuit_open", False):
+        return None  # the host's circuit breaker is already holding it back
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status", None)
+    if status is not None:
+        return f"HTTP {status}" if status in PAUSE_STATUSES or status >= 500 else None
+    if is_connection_error(exc):
+        return type(exc).__name__
+    return None
+
+
+def is_connection_error(exc):
+    """
+    Connection failures and timeouts. Not the rest of requests' exceptions:
+    they all derive from OSError, config errors like MissingSchema included.
+    """
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+    aiohttp = sys.modules.get("aiohttp")  # only loaded by the async tracker
+    return aiohttp is not None and isinstance(exc, aiohttp.ClientConnectionError)
+
+
+def is_config_error(exc):
+    """A malformed URL or header in the series' own config (requests' and aiohttp's are ValueErrors)."""
+    return isinstance(exc, ValueError)
+
+
+class HostState:
+    def __init__(self, host, concurrency, min_delay):
+        self.host = host
+        self.concurrency = concurrency
+        self.min_delay = min_delay
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+        self.paused_until = 0.0
+        self.failures = 0
+        self.async_slots = None
+
+    def is_paused(self):
+        return time.monotonic() < self.paused_until
+
+    def reserve_start(self):
+        """Seconds to wait before this request may start."""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.min_delay
+            return start - now
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_failure(self, reason, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            pause = retry_after or min(PAUSE_BASE * 2 ** (self.failures - 1), PAUSE_MAX)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        print(f"⏸️ Pausing {self.host} for {pause:.0f}s ({reason})")
+
+
+class HostScheduler:
+    def __init__(self):
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def state_for(self, url):
+        host = host_of(url)
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                concurrency, min_delay = HOST_POLITENESS.get(host, DEFAULT_POLITENESS)
+                state = self.hosts[host] = HostState(host, concurrency, min_delay)
+            return state
+
+    def _handle_failure(self, state, exc):
+        reason = host_failure_reason(exc)
+        if reason:
+            # requests keeps headers on exc.response, aiohttp on the exception
+            headers = getattr(getattr(exc, "response", None), "headers", None)
+            if headers is None:
+                headers = getattr(exc, "headers", None)
+            retry_after = parse_retry_after(headers) if headers is not None else None
+            state.record_failure(reason, retry_after)
+
+    # --- Threads ---
+
+    def run(self, jobs, fn, on_failure, deadline=None):
+        """
+        Call fn(key, job) for every job, where jobs is {key: (url, job)}.
+        Exceptions (including HostPausedError and CycleDeadlineExceeded for
+        skipped jobs) go to on_failure(key, job, exc). Jobs that can't start
+        before `deadline` (a time.monotonic() value) are skipped. Returns
+        when every job is done or skipped.
+        """
+        by_host = defaultdict(deque)
+        for key, (url, job) in jobs.items():
+            by_host[self.state_for(url)].append((key, job))
+
+        def worker(state, queue):
+            while True:
+                try:
+                    key, job = queue.popleft()
+                except IndexError:
+                    return
+                if state.is_paused():
+                    on_failure(key, job, HostPausedError(state.host))
+                    continue
+                wait = state.reserve_start()
+                if deadline is not None and time.monotonic() + wait >= deadline:
+                    on_failure(key, job, CycleDeadlineExceeded(state.host))
+                    continue
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    fn(key, job)
+                    state.record_success()
+                except Exception as e:
+                    self._handle_failure(state, e)
+                    on_failure(key, job, e)
+
+        workers = [
+            (state, queue)
+            for state, queue in by_host.items()
+            for _ in range(min(state.concurrency, len(queue)))
+        ]
+        if not workers:
+            return
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(workers))) as pool:
+            for future in [pool.submit(worker, state, queue) for state, queue in workers]:
+                future.result()
+
+    # --- asyncio ---
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """
+        Async politeness: holds one of the host's slots and honours its
+        start delay. Raises HostPausedError if the host is paused.
+        """
+        state = self.state_for(url)
+        if state.async_slots is None:
+            state.async_slots = asyncio.Semaphore(state.concurrency)
+
+        async with state.async_slots:
+            if state.is_paused():
+                raise HostPausedError(state.host)
+            wait = state.reserve_start()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                yield
+            except Exception as e:
+                self._handle_failure(state, e)
+                raise
+            state.record_success()
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = HostScheduler()
+    return _scheduler
@@ -0,0 +1,290 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared HTTP client for every MangaDex and scraper request: pooled
+# keep-alive sessions, a token bucket and circuit breaker per host, and
+# retries that respect the server's rate-limit headers and stay within the
+# host's latency budget.
+
+# Base URL of the MangaDex API; point it at a local stand-in for benchmarks
+MANGADEX_API = os.getenv("MANGADEX_API_URL", "https://api.mangadex.org").rstrip("/")
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (5, 15)
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# requests per second, burst size
+HOST_RATE_LIMITS = {
+    "api.mangadex.org": (5, 5),   # MangaDex global limit is ~5 req/s per IP
+    "uploads.mangadex.org": (5, 5),
+}
+# scraper sites get a gentler default
+DEFAULT_RATE_LIMIT = (2, 2)
+
+# seconds a single get() may spend on one host, retries included
+HOST_LATENCY_BUDGETS = {
+    "api.mangadex.org": 30,
+    "uploads.mangadex.org": 30,
+}
+DEFAULT_LATENCY_BUDGET = 15
+
+# consecutive failures before a host's circuit opens, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 5 * 60
+
+POOL_SIZE = 20
+
+USER_AGENT = "mangadex_requester (+https://github.com/Zneed99/mangadex_requester.py)"
+
+# Callables hook(host, url, status, elapsed) run after every HTTP attempt,
+# sync or async; status is None when the request failed without a response.
+# Used by the benchmarks and metrics.
+REQUEST_HOOKS = []
+
+
+class TokenBucket:
+    """Thread-safe token bucket. reserve() returns how long to wait for a token."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for the given time (e.g. after a 429)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a host whose circuit is open."""
+
+    circuit_open = True
+
+
+class CircuitBreaker:
+    """
+    After `threshold` failures in a row the circuit opens and calls to the
+    host fail fast for `cooldown` seconds. Then one trial call is let
+    through: success closes the circuit, failure keeps it open for another
+    cooldown.
+    """
+
+    def __init__(self, host, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown:
+                return False
+            # half-open: this caller is the trial, everyone else waits another cooldown
+            self.opened_at = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"🔌 Circuit for {self.host} closed again")
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures < self.threshold:
+                return
+            if self.opened_at is None:
+                print(f"🔌 Circuit for {self.host} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+
+_buckets = {}
+_breakers = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(host):
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate, capacity = HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            bucket = _buckets[host] = TokenBucket(rate, capacity)
+        return bucket
+
+
+def breaker_for(host):
+    with _buckets_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def latency_budget(host):
+    return HOST_LATENCY_BUDGETS.get(host, DEFAULT_LATENCY_BUDGET)
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+# one keep-alive session per host, so each site gets its own connection
+# pool and cookies
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_for(host):
+    with _sessions_lock:
+        host_session = _sessions.get(host)
+        if host_session is None:
+            host_session = _sessions[host] = _build_session()
+        return host_session
+
+
+# --- Rate-limit headers ---
+
+def parse_retry_after(headers):
+    """Seconds to wait from Retry-After / X-RateLimit-Retry-After, or None."""
+    value = headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    # MangaDex sends the unix timestamp at which the window resets
+    value = headers.get("X-RateLimit-Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def note_rate_limit(bucket, headers):
+    """Pause the host's bucket when the server says the window is used up."""
+    remaining = headers.get("X-RateLimit-Remaining")
+    if remaining is not None and remaining.strip() == "0":
+        wait = parse_retry_after(headers)
+        if wait:
+            bucket.pause(wait)
+
+
+def notify_request(host, url, status, elapsed):
+    for hook in REQUEST_HOOKS:
+        try:
+            hook(host, url, status, elapsed)
+        except Exception as e:
+            print(f"❌ Request hook failed: {e}")
+
+
+def retry_delay(headers, attempt):
+    wait = parse_retry_after(headers) if headers is not None else None
+    if wait is None:
+        wait = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+    return wait
+
+
+# --- Requests ---
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES):
+    """
+    Drop-in for requests.get with pooling, per-host rate limiting, retries
+    and circuit breaking. Raises requests.RequestException like requests
+    does (CircuitOpenError while the host's circuit is open); callers still
+    call raise_for_status() on the returned response.
+    """
+    host = urlsplit(url).hostname
+    breaker = breaker_for(host)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {host}, skipping {url}")
+
+    try:
+        response = _get_with_retries(url, host, params, headers, timeout, retries)
+    except (requests.ConnectionError, requests.Timeout):
+        # other RequestExceptions (MissingSchema, InvalidURL, ...) are the caller's fault, not the host's
+        breaker.record_failure()
+        raise
+
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def _get_with_retries(url, host, params, headers, timeout, retries):
+    bucket = bucket_for(host)
+    host_session = session_for(host)
+    # don't start a retry that would run past the host's latency budget
+    deadline = time.monotonic() + latency_budget(host)
+
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        started = time.perf_counter()
+        try:
+            response = host_session.get(url, params=params, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            notify_request(host, url, None, time.perf_counter() - started)
+            delay = retry_delay(None, attempt)
+            if attempt >= retries or time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+            continue
+
+        notify_request(host, url, response.status_code, time.perf_counter() - started)
+        note_rate_limit(bucket, response.headers)
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            delay = retry_delay(response.headers, attempt)
+            if response.status_code == 429:
+                bucket.pause(delay)
+            if time.monotonic() + delay <= deadline:
+                print(f"⏳ {response.status_code} from {url}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+        return response
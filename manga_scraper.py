@@ -1,8 +1,18 @@
 import requests
-from bs4 import BeautifulSoup
+import http_client
+import metrics
+import storage
+from host_scheduler import CycleDeadlineExceeded, HostPausedError, get_scheduler, is_config_error
+from chapter_set import parse_chapter_number
 import re
 import json
 import os
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 
 # User-Agent headers to avoid basic blocking
 HEADERS = {
@@ -12,59 +22,415 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-STATE_FILE = "observed_series.json"
+DEFAULT_PARSER = "html.parser"
+# first run of digits in the selected element's text
+CHAPTER_REGEX = r"(\d+)"
+EARLY_EXIT_CHUNK = 64 * 1024
+# pseudo-classes that depend on what comes after an element, so a match in
+# a partial tree can stop matching later: these selectors always get a full parse
+LOOKAHEAD_SELECTOR = re.compile(r":(?:nth-last-child|nth-last-of-type|last-child|last-of-type|only-child|only-of-type|empty)\b")
+
+# ETag / Last-Modified / body hash and last parsed chapter per check_url,
+# so unchanged pages are neither downloaded again nor re-parsed
+SCRAPER_CACHE_FILE = "scraper_cache.json"
+
+_page_cache = None
+_page_cache_dirty = False
 
 
 def load_observed_series():
-    """Load observed series from JSON file."""
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    """Load observed series from the configured storage backend."""
+    return storage.get_store().load()
+
+
+# --- Page cache ---
+
+def get_page_cache():
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = {}
+        if os.path.exists(SCRAPER_CACHE_FILE):
+            try:
+                with open(SCRAPER_CACHE_FILE, "r") as f:
+                    _page_cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"❌ Ignoring unreadable {SCRAPER_CACHE_FILE}: {e}")
+    return _page_cache
+
+
+def save_page_cache():
+    global _page_cache_dirty
+    if not _page_cache_dirty:
+        return
+    tmp_path = SCRAPER_CACHE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(get_page_cache(), f, indent=4)
+    os.replace(tmp_path, SCRAPER_CACHE_FILE)
+    _page_cache_dirty = False
+
+
+def _reusable_entry(series):
+    """The page cache entry for this config's page, or None if it was parsed with another selector/regex."""
+    entry = get_page_cache().get(series["check_url"])
+    if (
+        entry is not None
+        and entry.get("selector") == series["check_selector"]
+        and entry.get("chapter_regex") == series.get("chapter_regex")
+    ):
+        return entry
+    return None
+
+
+def conditional_headers(series):
+    """
+    Request headers plus If-None-Match / If-Modified-Since for a page whose
+    last parse still applies; after /configure changes the selector or regex
+    the page has to be downloaded and parsed again.
+    """
+    headers = dict(HEADERS)
+    entry = _reusable_entry(series)
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def needs_refetch(series, status):
+    """True for a 304 we have no usable cached result for: fetch again without validators."""
+    return status == 304 and _reusable_entry(series) is None
+
+
+def cached_page_result(series, status, body):
+    """
+    (chapter, content_hash); chapter is the stored result when the page is
+    unchanged since the last parse, None when it has to be parsed.
+    """
+    entry = _reusable_entry(series)
+
+    if status == 304 and entry is not None:
+        return _cached_result(series, entry), entry.get("content_hash")
+
+    content_hash = hashlib.sha256(body.encode("utf-8", "replace")).hexdigest()
+    if entry is not None and entry.get("content_hash") == content_hash:
+        return _cached_result(series, entry), content_hash
+    return None, content_hash
+
+
+def remember_page(series, headers, content_hash, chapter):
+    global _page_cache_dirty
+    cache = get_page_cache()
+    previous = cache.get(series["check_url"]) or {}
+    cache[series["check_url"]] = {
+        # a 304 may leave out validators we already have
+        "etag": headers.get("ETag") or previous.get("etag"),
+        "last_modified": headers.get("Last-Modified") or previous.get("last_modified"),
+        "content_hash": content_hash,
+        "selector": series["check_selector"],
+        "chapter_regex": series.get("chapter_regex"),
+        "chapter_number": chapter[0],
+    }
+    _page_cache_dirty = True
+
+
+def _cached_result(series, entry):
+    chapter_number = entry.get("chapter_number")
+    if chapter_number is None:
+        return None, None
+    return chapter_number, series["read_url_template"].format(chapter_number)
 
 
 def get_latest_chapter_from_config(series):
     """Fetch the latest chapter number and build reading link."""
-    try:
-        response = requests.get(series["check_url"], headers=HEADERS, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"Failed to fetch {series['check_url']}: {e}")
-        return None, None
+    with metrics.timer("tracker_lookup_duration_seconds", lookup="scraper"):
+        try:
+            result, page = fetch_page(series)
+        except requests.RequestException as e:
+            print(f"Failed to fetch {series['check_url']}: {e}")
+            return None, None
+        if page is None:
+            return result
+
+        headers, content_hash, body = page
+        with metrics.timer("tracker_parse_duration_seconds"):
+            chapter = parse_latest_chapter(series, body)
+        remember_page(series, headers, content_hash, chapter)
+        return chapter
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    element = soup.select_one(series["check_selector"])
-    if not element:
+
+def timed_parse(series, html):
+    """parse_latest_chapter plus the seconds it took, for parses run in the process pool."""
+    started = time.perf_counter()
+    chapter = parse_latest_chapter(series, html)
+    return chapter, time.perf_counter() - started
+
+
+def parse_latest_chapter(series, html):
+    """Extract the latest chapter number and reading link from a fetched page."""
+    backend = series.get("parser") or DEFAULT_PARSER
+    text = select_text(backend, series["check_selector"], html, series.get("early_exit", False))
+    if text is None:
         print(f"No element found for selector '{series['check_selector']}' at {series['check_url']}")
         return None, None
 
     # Extract chapter number using regex
-    match = re.search(r"(\d+)", element.text)
+    match = compiled_regex(series.get("chapter_regex") or CHAPTER_REGEX).search(text)
     if not match:
-        print(f"Could not extract chapter number from '{element.text.strip()}'")
+        print(f"Could not extract chapter number from '{text.strip()}'")
         return None, None
 
-    chapter_number = int(match.group(1))
+    # configs saved before /configure checked for a group use the whole match
+    chapter_number = parse_chapter_number(match.group(1) if match.re.groups else match.group(0))
+    if chapter_number is None:
+        print(f"'{match.group(0)}' is not a chapter number")
+        return None, None
     read_link = series["read_url_template"].format(chapter_number)
     return chapter_number, read_link
 
 
+# --- Parser backends ---
+# Chosen per config with "parser": "html.parser" (BeautifulSoup, default),
+# "lxml" or "selectolax". "early_exit": true (lxml only) stops parsing as
+# soon as the selector has a complete match. Backends are imported on first
+# use, so a cycle where every page is unchanged never loads a parser.
+
+@lru_cache(maxsize=None)
+def load_backend(backend):
+    """The backend's module, or None if it isn't installed."""
+    try:
+        if backend == "lxml":
+            import lxml.cssselect
+            import lxml.etree
+            import lxml.html
+            return lxml
+        if backend == "selectolax":
+            import selectolax.parser
+            return selectolax.parser
+        import bs4
+        return bs4
+    except ImportError:
+        return None
+
+
+def select_text(backend, selector, html, early_exit=False):
+    """Text of the first element matching selector, or None."""
+    if backend == "lxml" and (lxml := load_backend("lxml")) is not None:
+        if early_exit and not LOOKAHEAD_SELECTOR.search(selector):
+            return _select_text_lxml_streaming(lxml, selector, html)
+        root = lxml.html.fromstring(html)
+        matches = compiled_css(selector)(root)
+        return matches[0].text_content() if matches else None
+
+    if backend == "selectolax" and (selectolax := load_backend("selectolax")) is not None:
+        node = selectolax.HTMLParser(html).css_first(selector)
+        return node.text() if node is not None else None
+
+    if backend != "html.parser":
+        warn_parser_fallback(backend)
+
+    bs4 = load_backend("html.parser")
+    element = compiled_soup_selector(selector).select_one(bs4.BeautifulSoup(html, "html.parser"))
+    return element.text if element is not None else None
+
+
+@lru_cache(maxsize=None)
+def warn_parser_fallback(backend):
+    """Say once per backend (not once per page) that html.parser stands in for it."""
+    if backend not in ("html.parser", "lxml", "selectolax"):
+        print(f"Unknown parser '{backend}', using html.parser")
+    else:
+        print(f"Parser '{backend}' is not installed, using html.parser")
+
+
+def _select_text_lxml_streaming(lxml, selector, html):
+    """Feed the page to lxml in chunks and stop once the first match has closed."""
+    parser = lxml.etree.HTMLPullParser(events=("start", "end"))
+    css = compiled_css(selector)
+    root = None
+    closed = set()
+
+    for start in range(0, len(html), EARLY_EXIT_CHUNK):
+        parser.feed(html[start:start + EARLY_EXIT_CHUNK])
+        for event, element in parser.read_events():
+            if root is None and event == "start":
+                root = element
+            elif event == "end":
+                closed.add(element)
+        if root is None:
+            continue
+        # the partial tree is a prefix of the document, so its first match
+        # is the document's first match
+        matches = css(root)
+        if matches and matches[0] in closed:
+            return matches[0].text_content()
+
+    root = parser.close()
+    matches = css(root)
+    return matches[0].text_content() if matches else None
+
+
+@lru_cache(maxsize=512)
+def compiled_css(selector):
+    return load_backend("lxml").cssselect.CSSSelector(selector)
+
+
+@lru_cache(maxsize=512)
+def compiled_soup_selector(selector):
+    import soupsieve
+    return soupsieve.compile(selector)
+
+
+@lru_cache(maxsize=512)
+def compiled_regex(pattern):
+    return re.compile(pattern)
+
+
+def chapter_regex_error(pattern):
+    """Why a chapter_regex can't be used (it must compile and have exactly one group), or None."""
+    try:
+        groups = re.compile(pattern).groups
+    except re.error as e:
+        return f"not a valid regex: {e}"
+    if groups != 1:
+        return f"needs exactly one group capturing the chapter number, found {groups}"
+    return None
+
+
+# --- Pipeline ---
+# Fetching is I/O-bound and parsing is CPU-bound, so scrape_all runs them as
+# two stages: fetch threads (scheduled per host by host_scheduler) feed a
+# bounded queue, and a process pool parses what comes out of it. A slow parse no longer holds up other fetches, and
+# parsing scales across cores.
+
+SCRAPER_RETRIES = 1
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", str(os.cpu_count() or 2)))
+# pages waiting for, or being, parsed
+PARSE_QUEUE_SIZE = int(os.getenv("SCRAPER_PARSE_QUEUE_SIZE", "32"))
+
+_parse_pool = None
+
+
+def get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_pool
+
+
+def fetch_page(series):
+    """
+    Fetch stage: returns (result, page). result is set when the page is
+    unchanged and needs no parse; otherwise page is
+    (headers, content_hash, body) for the parse stage.
+    Raises requests.RequestException.
+    """
+    url = series["check_url"]
+    # host-level trouble is handled by host_scheduler pausing the host,
+    # so don't sit in long retry loops here
+    response = http_client.get(
+        url, headers=conditional_headers(series), timeout=10, retries=SCRAPER_RETRIES
+    )
+    if needs_refetch(series, response.status_code):
+        response = http_client.get(url, headers=HEADERS, timeout=10, retries=SCRAPER_RETRIES)
+    response.raise_for_status()
+
+    chapter, content_hash = cached_page_result(series, response.status_code, response.text)
+    if chapter is not None:
+        remember_page(series, response.headers, content_hash, chapter)
+        return chapter, None
+    return None, (response.headers, content_hash, response.text)
+
+
+def scrape_all(configs, deadline=None):
+    """
+    Run every scraper config through the fetch -> parse pipeline.
+    configs: {key: optional_scraper config}; returns {key: (chapter_number, read_link)}.
+    Fetches that can't start before `deadline` (time.monotonic()) come back as (None, None).
+    """
+    results = {}
+    if not configs:
+        return results
+
+    pages = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+    in_flight = threading.BoundedSemaphore(PARSE_QUEUE_SIZE)
+    done = object()
+
+    def fetch(key, series):
+        result, page = fetch_page(series)
+        if page is None:
+            results[key] = result
+        else:
+            pages.put((key, series, page))  # blocks while the parse stage is behind
+
+    def fetch_failed(key, series, exc):
+        if isinstance(exc, HostPausedError):
+            print(f"⏭️ Skipping {series['check_url']}: {exc} is paused")
+        elif isinstance(exc, CycleDeadlineExceeded):
+            print(f"⏱️ Deferring {series['check_url']} to the next cycle")
+        elif is_config_error(exc):
+            print(f"⚠️ Scraper config for {series['check_url']} is invalid: {exc}")
+        else:
+            print(f"Failed to fetch {series['check_url']}: {exc}")
+        results[key] = (None, None)
+
+    def fetch_stage():
+        # hosts run in parallel, each within its own politeness limits
+        try:
+            jobs = {key: (series["check_url"], series) for key, series in configs.items()}
+            get_scheduler().run(jobs, fetch, fetch_failed, deadline)
+        finally:
+            pages.put(done)
+
+    producer = threading.Thread(target=fetch_stage, daemon=True)
+    producer.start()
+
+    parse_pool = get_parse_pool()
+    parsing = {}
+    while (item := pages.get()) is not done:
+        key, series, (headers, content_hash, body) = item
+        in_flight.acquire()
+        future = parse_pool.submit(timed_parse, series, body)
+        future.add_done_callback(lambda _: in_flight.release())
+        parsing[future] = (key, series, headers, content_hash)
+    producer.join()
+
+    for future in as_completed(parsing):
+        key, series, headers, content_hash = parsing[future]
+        try:
+            chapter, elapsed = future.result()
+            metrics.observe("tracker_parse_duration_seconds", elapsed)
+        except Exception as e:
+            print(f"❌ Failed to parse {series['check_url']}: {e}")
+            chapter = (None, None)
+        remember_page(series, headers, content_hash, chapter)
+        results[key] = chapter
+
+    return results
+
+
 def check_all_optional_scrapers():
     """Loop through all series with optional scraper config in observed_series.json."""
     observed_series = load_observed_series()
-    for mid, series_data in observed_series.items():
-        scraper_config = series_data.get("optional_scraper")
-        if not scraper_config:
-            continue
+    configs = {
+        mid: series_data.optional_scraper
+        for mid, series_data in observed_series.items()
+        if (series_data.optional_scraper or {}).get("check_url")
+    }
+    results = scrape_all(configs)
 
-        print(f"\nChecking series: {series_data['title']} (Optional Scraper)")
-        chapter_number, read_link = get_latest_chapter_from_config(scraper_config)
+    for mid in configs:
+        series_data = observed_series[mid]
+        print(f"\nChecking series: {series_data.title} (Optional Scraper)")
+        chapter_number, read_link = results[mid]
         if chapter_number:
             print(f"Latest chapter: {chapter_number}")
             print(f"Read link: {read_link}")
         else:
             print("Could not find latest chapter.")
 
+    save_page_cache()
+
 
 if __name__ == "__main__":
     check_all_optional_scrapers()
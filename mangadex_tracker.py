@@ -1,28 +1,124 @@
 import requests
+import http_client
+import metrics
+import storage
+from title_index import TitleIndex, series_titles
+from chapter_set import ChapterSet, parse_chapter_number
+from models import Chapter, Series
+from subscriptions import (
+    LEGACY_KEY,
+    subscriber_key,
+    add_subscriber,
+    remove_subscriber,
+    has_subscriptions,
+    is_subscribed,
+    is_orphaned,
+    visible_to,
+    read_state,
+    notification_targets,
+)
+from cache import MISSING, get_cache
+from outbox import get_outbox
+from chapter_history import HISTORY_PAGE_SIZE, get_chapter_history
+from host_scheduler import CycleDeadlineExceeded
 import json
 import os
-import discord
-from manga_scraper import get_latest_chapter_from_config
-from discord.ui import View, Button
-from discord import Embed, ui, ButtonStyle
+import time
+from datetime import datetime, timedelta, timezone
+from manga_scraper import scrape_all, save_page_cache
 
 
-STATE_FILE = "observed_series.json"
+STATE_FILE = storage.STATE_FILE
+
+# MangaDex caps list endpoints at 100 results per page
+MANGADEX_BATCH_SIZE = 100
+# /manga and /chapter hide pornographic entries unless asked explicitly
+CONTENT_RATINGS = ["safe", "suggestive", "erotica", "pornographic"]
+
+# Incremental polling: /chapter?createdAtSince= from the last successful poll
+FEED_CURSOR_FILE = "feed_cursor.json"
+# MangaDex refuses offset + limit above 10000
+FEED_MAX_OFFSET = 10000
+# Re-read a little of the previous window in case chapters are indexed late
+FEED_OVERLAP = timedelta(minutes=5)
+
+# Worst-case seconds for one poll cycle; series whose sources haven't
+# answered by then are left for the next cycle
+CYCLE_DEADLINE = float(os.getenv("CYCLE_DEADLINE", "120"))
 
 # --- Persistence Layer ---
 
 
 #
 def load_observed_series():
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return storage.get_store().load()
+
+
+def save_observed_series(observed_series, manga_id=None):
+    """Persist observed_series; pass manga_id when only that series changed."""
+    with metrics.timer("tracker_persist_duration_seconds", operation="save"):
+        storage.get_store().save(observed_series, manga_id)
+
+
+def flush_observed_series():
+    """Write out any coalesced changes now (end of a poll cycle, shutdown)."""
+    with metrics.timer("tracker_persist_duration_seconds", operation="flush"):
+        storage.get_store().flush()
+
+
+def persist_cycle_state():
+    """End of a poll cycle: write coalesced series changes and the scraper page cache."""
+    flush_observed_series()
+    with metrics.timer("tracker_persist_duration_seconds", operation="page_cache"):
+        save_page_cache()
+
+
+def delete_observed_series(observed_series, manga_id):
+    del observed_series[manga_id]
+    get_title_index(observed_series).remove(manga_id)
+    storage.get_store().delete(observed_series, manga_id)
+    get_chapter_history().forget(manga_id)
+
 
+# --- Title lookup ---
 
-def save_observed_series(observed_series):
-    with open(STATE_FILE, "w") as f:
-        json.dump(observed_series, f, indent=4)
+_title_index = None
+_title_index_source = None
+
+
+def get_title_index(observed_series):
+    """Title index for this observed_series, rebuilt if it's a different or out-of-sync dict."""
+    global _title_index, _title_index_source
+    if (
+        _title_index is None
+        or _title_index_source is not observed_series
+        or len(_title_index) != len(observed_series)
+    ):
+        _title_index = TitleIndex.build(observed_series)
+        _title_index_source = observed_series
+    return _title_index
+
+
+def find_series_by_title(title, observed_series):
+    """Tracked (manga_id, series_data) pairs whose title or alt titles contain `title`, best first."""
+    return [
+        (mid, observed_series[mid])
+        for mid in get_title_index(observed_series).search(title)
+        if mid in observed_series
+    ]
+
+
+def load_feed_cursor():
+    if os.path.exists(FEED_CURSOR_FILE):
+        with open(FEED_CURSOR_FILE, "r") as f:
+            return json.load(f).get("created_at_since")
+    return None
+
+
+def save_feed_cursor(cycle_started_at):
+    cursor = (cycle_started_at - FEED_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S")
+    with open(FEED_CURSOR_FILE, "w") as f:
+        json.dump({"created_at_since": cursor}, f, indent=4)
 
 
 # --- Developer functions --- #
@@ -34,101 +130,205 @@ def manual_recheck():
 
 # --- Tracker ---
 
-def check_for_updates(observed_series, return_messages=False):
+def check_for_updates(observed_series, return_messages=False, deferred=None):
+    """
+    Look up every series' latest chapter and run the optional scrapers.
+    Series whose MangaDex lookup didn't fit before CYCLE_DEADLINE are left
+    for the next cycle; if a set is passed as `deferred`, their ids are
+    added to it.
+    """
+    started = time.perf_counter()
     messages = []
+    deadline = time.monotonic() + CYCLE_DEADLINE
+    with metrics.timer("tracker_lookup_duration_seconds", lookup="mangadex_cycle"):
+        md_latest = get_latest_english_chapters(list(observed_series.keys()), deadline)
+    unchecked = [mid for mid in observed_series if mid not in md_latest]
+    if unchecked:
+        print(f"⏱️ Deferring {len(unchecked)} MangaDex lookups to the next cycle")
+        if deferred is not None:
+            deferred.update(unchecked)
+    scraper_results = scrape_all(scraper_configs(observed_series), deadline)
 
     for manga_id, series_data in observed_series.items():
-        manga_title = series_data.get("title", "Unknown Title")
-        last_seen_number = float(series_data.get("last_chapter_number", 0))
-        cover_url = series_data.get("cover_url")  # optional stored cover
-
-        # --- fetch latest MangaDex chapter ---
-        md_latest_id, md_chapter_info, _ = get_latest_english_chapter(manga_id)
-        md_chapter_number = float(md_chapter_info.get("chapter", 0)) if md_chapter_info else None
-        md_chapter_title = md_chapter_info.get("title", "No title") if md_chapter_info else ""
-        md_chapter_url = f"https://mangadex.org/chapter/{md_latest_id}" if md_latest_id else None
-        md_cover_url = series_data.get("cover_url")
-
-        # --- optional scraper ---
-        scraper_chapter_number = None
-        scraper_read_link = None
-        optional_scraper = series_data.get("optional_scraper")
-        if optional_scraper:
-            s_chapter_number, s_read_link = get_latest_chapter_from_config(optional_scraper)
-            if s_chapter_number is not None:
-                scraper_chapter_number = float(s_chapter_number)
-                scraper_read_link = s_read_link
-
-        # --- decide which chapter to notify ---
-        latest_chapter_number = last_seen_number
-        latest_embed = None
-        latest_view = None
-
-        # --- MangaDex chapter ---
-        if md_chapter_number and md_chapter_number > last_seen_number:
-            latest_chapter_number = md_chapter_number
-            embed = Embed(
-                title=f"📢 New Chapter Released! {manga_title}",
-                description=f"Chapter {md_chapter_number}: {md_chapter_title}",
-                color=0x1ABC9C
-            )
-            if md_cover_url:
-                embed.set_image(url=md_cover_url)
-
-            view = View(timeout=None)
-            view.add_item(Button(label="📖 Jump to Chapter", url=md_chapter_url))
-            view.add_item(Button(
-                label="✅ Mark as Read",
-                style=ButtonStyle.success,
-                custom_id=f"markread_{manga_id}_{md_chapter_number}"
-            ))
-
-            latest_embed = embed
-            latest_view = view
-
-        # --- Optional scraper chapter ---
-        if scraper_chapter_number and scraper_chapter_number > latest_chapter_number:
-            latest_chapter_number = scraper_chapter_number
-            embed = Embed(
-                title=f"📢 New Chapter Released (Secondary Source)! {manga_title}",
-                description=f"Chapter {scraper_chapter_number}",
-                color=0x00FF00
-            )
-            if cover_url:
-                embed.set_image(url=md_cover_url)
-
-            view = View(timeout=None)
-            view.add_item(Button(label="📖 Jump to Chapter", url=scraper_read_link))
-            view.add_item(Button(
-                label="✅ Mark as Read",
-                style=ButtonStyle.success,
-                custom_id=f"markread_{manga_id}_{scraper_chapter_number}"
-            ))
-
-            latest_embed = embed
-            latest_view = view
-
-        # --- update observed_series and save ---
-        if latest_chapter_number > last_seen_number:
-            series_data["last_chapter_number"] = str(latest_chapter_number)
-            save_observed_series(observed_series)
-            if return_messages:
-                messages.append((latest_embed, latest_view))
-            else:
-                print(f"New chapter for {manga_title}: {latest_chapter_number}")
+        # --- latest MangaDex chapter (fetched in batches above) ---
+        md_latest_id, md_chapter_info = md_latest.get(manga_id, (None, None))
 
+        update = evaluate_series_update(
+            manga_id, series_data, md_latest_id, md_chapter_info,
+            scraper_results.get(manga_id),
+        )
+        if update:
+            record_series_update(observed_series, manga_id, update, messages, return_messages)
+
+    persist_cycle_state()
+    record_cycle_metrics("sync", started, observed_series, len(unchecked))
+    return messages if return_messages else None
+
+
+def check_for_updates_incremental(observed_series, return_messages=False):
+    """
+    Like check_for_updates, but only asks MangaDex for chapters created since
+    the last successful poll (one paginated /chapter query for the whole
+    library) instead of looking up every series. The first run, without a
+    saved cursor, does a full check to establish one.
+    """
+    cycle_started_at = datetime.now(timezone.utc)
+    since = load_feed_cursor()
+    if since is None:
+        deferred = set()
+        result = check_for_updates(observed_series, return_messages, deferred)
+        # a series left unchecked still needs its full lookup before the cursor starts
+        if not deferred:
+            save_feed_cursor(cycle_started_at)
+        return result
+
+    started = time.perf_counter()
+    messages = []
+    deadline = time.monotonic() + CYCLE_DEADLINE
+    try:
+        with metrics.timer("tracker_lookup_duration_seconds", lookup="mangadex_cycle"):
+            md_latest = get_english_chapters_since(since, set(observed_series), deadline)
+    except requests.RequestException as e:
+        # keep the cursor so the next cycle covers this window again
+        print(f"❌ Incremental chapter feed failed: {e}")
+        md_latest = None
+    except CycleDeadlineExceeded:
+        print("⏱️ Incremental chapter feed didn't finish before the cycle deadline")
+        md_latest = None
+
+    scraper_results = scrape_all(scraper_configs(observed_series), deadline)
+
+    for manga_id, series_data in observed_series.items():
+        md_latest_id, md_chapter_info = (md_latest or {}).get(manga_id, (None, None))
+        scraper_result = scraper_results.get(manga_id)
+
+        if md_latest_id is None and scraper_result is None:
+            continue
+
+        update = evaluate_series_update(
+            manga_id, series_data, md_latest_id, md_chapter_info, scraper_result
+        )
+        if update:
+            record_series_update(observed_series, manga_id, update, messages, return_messages)
+
+    if md_latest is not None:
+        save_feed_cursor(cycle_started_at)
+
+    persist_cycle_state()
+    record_cycle_metrics("sync", started, observed_series)
     return messages if return_messages else None
 
 
+def record_cycle_metrics(tracker, started, observed_series, deferred=None):
+    """Cycle duration (from a time.perf_counter() start) and library gauges."""
+    metrics.observe("tracker_cycle_duration_seconds", time.perf_counter() - started, tracker=tracker)
+    metrics.set_gauge("tracker_last_cycle_timestamp_seconds", time.time())
+    metrics.set_gauge("tracker_series_tracked", len(observed_series))
+    if deferred is not None:
+        metrics.set_gauge("tracker_series_deferred", deferred)
+
+
+def scraper_configs(observed_series):
+    """{manga_id: optional_scraper} for every series with a configured scraper."""
+    return {
+        manga_id: series_data.optional_scraper
+        for manga_id, series_data in observed_series.items()
+        if (series_data.optional_scraper or {}).get("check_url")
+    }
+
+
+def evaluate_series_update(manga_id, series_data, md_latest_id, md_chapter_info, scraper_result=None):
+    """
+    Decide whether a series has a new chapter, given the already fetched
+    MangaDex chapter and optional scraper result (chapter_number, read_link).
+    Returns (chapter_number, notification) for the newest chapter, or None;
+    notification is a plain dict (see notification_embed) so it can be queued
+    and persisted. Shared by the blocking tracker and async_tracker.
+    """
+    manga_title = series_data.title
+    last_seen_number = series_data.last_chapter_number or 0
+    cover_url = series_data.cover_url  # optional stored cover
+
+    md_chapter = Chapter.from_api(md_latest_id, md_chapter_info) if md_chapter_info else None
+
+    scraper_chapter_number = None
+    scraper_read_link = None
+    if scraper_result and scraper_result[0] is not None:
+        scraper_chapter_number = parse_chapter_number(scraper_result[0])
+        scraper_read_link = scraper_result[1]
+
+    # --- decide which chapter to notify ---
+    latest_chapter_number = last_seen_number
+    latest_notification = None
+
+    # --- MangaDex chapter ---
+    if md_chapter and md_chapter.number and md_chapter.number > last_seen_number:
+        latest_chapter_number = md_chapter.number
+        latest_notification = {
+            "manga_id": manga_id,
+            "chapter_id": md_latest_id,
+            "title": manga_title,
+            "chapter": md_chapter.number,
+            "chapter_title": md_chapter.title or "No title",
+            "url": f"https://mangadex.org/chapter/{md_latest_id}",
+            "cover_url": cover_url,
+            "secondary": False,
+        }
+
+    # --- Optional scraper chapter ---
+    if scraper_chapter_number and scraper_chapter_number > latest_chapter_number:
+        latest_chapter_number = scraper_chapter_number
+        latest_notification = {
+            "manga_id": manga_id,
+            "chapter_id": None,
+            "title": manga_title,
+            "chapter": scraper_chapter_number,
+            "chapter_title": None,
+            "url": scraper_read_link,
+            "cover_url": cover_url,
+            "secondary": True,
+        }
+
+    if latest_chapter_number > last_seen_number:
+        return latest_chapter_number, latest_notification
+    return None
+
+
+def record_series_update(observed_series, manga_id, update, messages, return_messages=False):
+    """
+    Store a new chapter found by evaluate_series_update and queue its
+    notification, with "targets" set to [channel_id, user_ids] pairs from
+    subscriptions.notification_targets to fan it out to. The notification
+    is written to the outbox before last_chapter_number moves on, so a
+    crash in between can't lose it.
+    """
+    latest_chapter_number, _ = update
+    series_data = observed_series[manga_id]
+    metrics.inc("tracker_updates_total")
+
+    if return_messages:
+        msg = series_update_message(series_data, update)
+        get_outbox().add(msg)
+        messages.append(msg)
+    else:
+        print(f"New chapter for {series_data.title}: {latest_chapter_number}")
+
+    # --- update observed_series and save ---
+    series_data.last_chapter_number = latest_chapter_number
+    save_observed_series(observed_series, manga_id)
+
+
+def series_update_message(series_data, update):
+    """The outbox message for an update from evaluate_series_update."""
+    _, notification = update
+    targets = notification_targets(series_data)
+    return {**notification, "targets": [list(t) for t in targets.items()]}
+
+
 # --- Add/Remove Functions --- #
 def search_manga_titles_for_tracking(search_title):
-    url = "https://api.mangadex.org/manga"
-    params = {"title": search_title, "limit": 10, "availableTranslatedLanguage[]": "en"}
-
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        results = response.json()["data"]
+        results = search_manga(search_title)
 
         if not results:
             return "❌ No matches found.", []
@@ -152,90 +352,209 @@ def fetch_manga_cover(manga_id: str) -> str | None:
     Fetch the cover URL for a MangaDex series by its manga_id.
     Returns None if no cover is found.
     """
-    try:
-        manga_url = f"https://api.mangadex.org/manga/{manga_id}"
-        resp = requests.get(manga_url)
-        resp.raise_for_status()
-        manga_json = resp.json()
-
-        # Look for the cover_art relationship
-        cover_file = None
-        for rel in manga_json.get("data", {}).get("relationships", []):
-            if rel.get("type") == "cover_art":
-                cover_file = rel.get("attributes", {}).get("fileName")
-                break
+    return fetch_manga_covers([manga_id]).get(manga_id)
 
-        if cover_file:
-            return f"https://uploads.mangadex.org/covers/{manga_id}/{cover_file}"
 
-    except requests.RequestException as e:
-        print(f"❌ Failed to fetch cover for {manga_id}: {e}")
+def fetch_manga_covers(manga_ids):
+    """
+    {manga_id: cover URL or None} for many series at once: one
+    /manga?ids[]=...&includes[]=cover_art request per 100 ids, skipping ids
+    whose cover is already cached. Ids from failed batches are left out.
+    """
+    cache = get_cache()
+    covers = {}
+    missing = []
+    for manga_id in dict.fromkeys(manga_ids):
+        cover_url = cache.get("cover", manga_id)
+        if cover_url is MISSING:
+            missing.append(manga_id)
+        else:
+            covers[manga_id] = cover_url
+
+    for batch, entries in manga_batches(missing, "covers", {"includes[]": ["cover_art"]}):
+        for entry in entries:
+            cover_url = cover_url_from_relationships(entry["id"], entry.get("relationships", []))
+            cache.set("cover", entry["id"], cover_url)
+            covers[entry["id"]] = cover_url
+        for manga_id in batch:
+            covers.setdefault(manga_id, None)  # not returned: deleted or hidden
 
+    return covers
+
+
+def fetch_manga_alt_titles(manga_ids):
+    """
+    {manga_id: altTitles} for many series at once, one /manga?ids[]=...
+    request per 100 ids. Ids from failed batches are left out.
+    """
+    alt_titles = {}
+    for batch, entries in manga_batches(list(dict.fromkeys(manga_ids)), "alt titles"):
+        for entry in entries:
+            alt_titles[entry["id"]] = entry["attributes"].get("altTitles", [])
+        for manga_id in batch:
+            alt_titles.setdefault(manga_id, [])  # not returned: deleted or hidden
+    return alt_titles
+
+
+def manga_batches(manga_ids, what, params=None):
+    """Yield (batch, manga entries) per /manga?ids[]=... request; failed batches are logged and skipped."""
+    for start in range(0, len(manga_ids), MANGADEX_BATCH_SIZE):
+        batch = manga_ids[start:start + MANGADEX_BATCH_SIZE]
+        try:
+            resp = http_client.get(f"{http_client.MANGADEX_API}/manga", params={
+                "ids[]": batch,
+                "limit": len(batch),
+                "contentRating[]": CONTENT_RATINGS,
+                **(params or {}),
+            })
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            print(f"❌ Failed to fetch {what} for {len(batch)} series: {e}")
+            continue
+        yield batch, resp.json()["data"]
+
+
+def cover_url_from_relationships(manga_id, relationships):
+    for rel in relationships:
+        if rel.get("type") == "cover_art":
+            cover_file = rel.get("attributes", {}).get("fileName")
+            if cover_file:
+                return f"https://uploads.mangadex.org/covers/{manga_id}/{cover_file}"
     return None
 
 
-def finalize_tracking(selection_index, choices, observed_series):
-    selected_title, selected_id, selected_entry = choices[selection_index]
+def missing_covers(observed_series):
+    """Ids of the tracked series that have no cover_url yet."""
+    return [mid for mid, data in observed_series.items() if not data.cover_url]
 
-    if selected_id in observed_series:
-        return f"⚠️ '{selected_title}' is already being tracked."
 
-    # Fetch latest English chapter
-    chapter_url = "https://api.mangadex.org/chapter"
+def apply_covers(observed_series, covers):
+    """Store fetched covers ({manga_id: cover URL or None}) and save once. Returns how many were added."""
+    updated = 0
+    for manga_id, cover_url in covers.items():
+        if cover_url and manga_id in observed_series:
+            observed_series[manga_id].cover_url = cover_url
+            updated += 1
+
+    if updated:
+        save_observed_series(observed_series)
+        flush_observed_series()
+    return updated
+
+
+def missing_alt_titles(observed_series):
+    """Ids of the tracked series added before alt titles were stored."""
+    return [mid for mid, data in observed_series.items() if "alt_titles" not in data.extra]
+
+
+def apply_alt_titles(observed_series, alt_titles):
+    """Store fetched alt titles ({manga_id: altTitles}), index them and save. Returns how many series gained any."""
+    index = get_title_index(observed_series)
+    updated = 0
+    for manga_id, titles in alt_titles.items():
+        series_data = observed_series.get(manga_id)
+        if series_data is None:
+            continue
+        series_data.extra["alt_titles"] = titles
+        index.add(manga_id, series_titles(series_data))
+        if titles:
+            updated += 1
+
+    if alt_titles:
+        save_observed_series(observed_series)
+        flush_observed_series()
+    return updated
+
+
+def backfill_covers(observed_series):
+    """Fill in every missing cover_url with bulk lookups and save once. Returns how many were added."""
+    return apply_covers(observed_series, fetch_manga_covers(missing_covers(observed_series)))
+
+
+def fetch_new_series(manga_id):
+    """
+    The MangaDex lookups for tracking a new series: its latest English
+    chapter and its cover. Returns (Chapter, cover_url), or an error message.
+    Touches no tracked-series state, so it can run in a worker thread.
+    """
+    chapter_url = f"{http_client.MANGADEX_API}/chapter"
     chap_params = {
-        "manga": selected_id,
+        "manga": manga_id,
         "limit": 1,
         "order[createdAt]": "desc",
         "translatedLanguage[]": "en",
     }
 
     try:
-        chapter_response = requests.get(chapter_url, params=chap_params)
+        chapter_response = http_client.get(chapter_url, params=chap_params)
         chapter_response.raise_for_status()
         chapter_data = chapter_response.json()["data"]
+    except requests.RequestException as e:
+        return f"❌ Error fetching chapter data: {e}"
 
-        if not chapter_data:
-            return "⚠️ No English chapter found. Series not added."
-
-        chapter = chapter_data[0]
-        chapter_id = chapter["id"]
-        chapter_number = chapter["attributes"].get("chapter", "N/A")
-        chapter_title = chapter["attributes"].get("title", "No title")
-
-        # Fetch manga cover
-        cover_url = fetch_manga_cover(selected_id)
-
-        # Add series to observed_series with all fields
-        observed_series[selected_id] = {
-            "title": selected_title,
-            "last_chapter_id": chapter_id,
-            "last_chapter_number": chapter_number,
-            "last_chapter_title": chapter_title,
-            "cover_url": cover_url,
-            "read_chapters": [],  # Start empty; used for unread tracking
-            # optional_scraper can be added later via /configure
-        }
+    if not chapter_data:
+        return "⚠️ No English chapter found. Series not added."
 
-        # Save updated series
-        save_observed_series(observed_series)
+    chapter = Chapter.from_api(chapter_data[0]["id"], chapter_data[0]["attributes"])
+    record_latest_chapters({manga_id: (chapter_data[0]["id"], chapter_data[0]["attributes"])})
+    chapter.title = chapter.title or "No title"
 
-        return (
-            f"✅ **{selected_title}** added and initial chapter recorded:\n"
-            f"📖 Chapter {chapter_number}: {chapter_title}\n"
-            f"🔗 https://mangadex.org/chapter/{chapter_id}"
-        )
+    return chapter, fetch_manga_cover(manga_id)
 
-    except requests.RequestException as e:
-        return f"❌ Error fetching chapter data: {e}"
 
+def finalize_tracking(selection_index, choices, observed_series, subscriber=None, fetched=None):
+    """
+    Track the chosen search result. subscriber is (guild_id, channel_id,
+    user_id); a series someone else already tracks just gains a subscriber,
+    without any MangaDex requests. fetched is fetch_new_series()'s result
+    when the caller already ran the lookups (e.g. off the event loop).
+    """
+    selected_title, selected_id, selected_entry = choices[selection_index]
 
+    if selected_id in observed_series:
+        if subscriber is None:
+            return f"⚠️ '{selected_title}' is already being tracked."
+        if subscribe_series(observed_series, selected_id, *subscriber):
+            return f"✅ Subscribed to **{selected_title}**."
+        return f"⚠️ You're already subscribed to '{selected_title}'."
+
+    if fetched is None:
+        fetched = fetch_new_series(selected_id)
+    if isinstance(fetched, str):
+        return fetched
+    chapter, cover_url = fetched
+
+    # Add series to observed_series with all fields
+    series_data = Series(
+        title=selected_title,
+        cover_url=cover_url,
+        read_chapters=[],  # Start empty; used for unread tracking
+        # tracked by a subscriber: theirs alone, not shared like pre-subscription series
+        subscribers={} if subscriber is not None else None,
+        # optional_scraper can be added later via /configure
+        extra={"alt_titles": selected_entry["attributes"].get("altTitles", [])},
+    )
+    series_data.set_last_chapter(chapter)
+    observed_series[selected_id] = series_data
+    if subscriber is not None:
+        guild_id, channel_id, user_id = subscriber
+        add_subscriber(series_data, subscriber_key(guild_id, user_id), guild_id, channel_id, user_id)
+    get_title_index(observed_series).add(selected_id, series_titles(series_data))
+
+    # Save updated series
+    save_observed_series(observed_series, selected_id)
+
+    return (
+        f"✅ **{selected_title}** added and initial chapter recorded:\n"
+        f"📖 Chapter {chapter.number if chapter.number is not None else 'N/A'}: {chapter.title}\n"
+        f"🔗 https://mangadex.org/chapter/{chapter.id}"
+    )
 
 
-def remove_series_by_title(title, observed_series):
+def remove_series_by_title(title, observed_series, subscriber_key=None):
     matches = {
-        mid: info
-        for mid, info in observed_series.items()
-        if title.lower() in info["title"].lower()
+        mid: info for mid, info in find_series_by_title(title, observed_series)
+        if subscriber_key is None or visible_to(info, subscriber_key)
     }
 
     if not matches:
@@ -245,20 +564,20 @@ def remove_series_by_title(title, observed_series):
         manga_id, info = next(iter(matches.items()))
         return {
             "prompt": (
-                f"🗑️ Confirm removal of '{info['title']}' (ID: `{manga_id}`) with `/confirm_remove {manga_id}`"
+                f"🗑️ Confirm removal of '{info.title}' (ID: `{manga_id}`) with `/confirm_remove {manga_id}`"
             ),
-            "options": [(manga_id, info["title"])],
+            "options": [(manga_id, info.title)],
         }
 
     message = "🔎 **Multiple matches found:**\n"
     sorted_matches = list(matches.items())
     for idx, (mid, info) in enumerate(sorted_matches, start=1):
-        message += f"[{idx}] {info['title']} | ID: `{mid}`\n"
+        message += f"[{idx}] {info.title} | ID: `{mid}`\n"
     message += "\nUse `/confirm_remove [number]` to select which one to remove."
 
     return {
         "prompt": message,
-        "options": [(mid, info["title"]) for mid, info in sorted_matches],
+        "options": [(mid, info.title) for mid, info in sorted_matches],
     }
 
 
@@ -266,25 +585,106 @@ def confirm_remove_by_id(manga_id, observed_series):
     if manga_id not in observed_series:
         return "❌ Could not find that manga ID in the tracked list."
 
-    title = observed_series[manga_id]["title"]
-    del observed_series[manga_id]
-    save_observed_series(observed_series)
+    title = observed_series[manga_id].title
+    delete_observed_series(observed_series, manga_id)
     return f"✅ '{title}' has been removed."
 
 
-def confirm_remove_by_index(index, matches, observed_series):
+def confirm_remove_by_index(index, matches, observed_series, subscriber_key=None):
     if not (0 <= index < len(matches)):
         return "❌ Invalid selection. Use a number from the search list."
 
     selected_id, selected_title = matches[index]
-    del observed_series[selected_id]
-    save_observed_series(observed_series)
+    series_data = observed_series.get(selected_id)
+    if series_data is not None and subscriber_key is not None and has_subscriptions(series_data):
+        if is_subscribed(series_data, subscriber_key):
+            unsubscribe_series(observed_series, selected_id, subscriber_key)
+            return f"✅ Unsubscribed from '{selected_title}'."
+        # a shared series someone also subscribed to: stop announcing it in
+        # the default channel, its subscribers keep it
+        unsubscribe_series(observed_series, selected_id, LEGACY_KEY)
+        if selected_id in observed_series:
+            return f"✅ '{selected_title}' is no longer tracked for the default channel."
+        return f"✅ '{selected_title}' has been removed."
+    if series_data is not None:
+        delete_observed_series(observed_series, selected_id)
     return f"✅ '{selected_title}' has been removed."
 
 
+# --- Subscriptions --- #
+def subscribe_series(observed_series, manga_id, guild_id, channel_id, user_id):
+    """Add a subscriber to a tracked series. Returns False if nothing changed."""
+    key = subscriber_key(guild_id, user_id)
+    if not add_subscriber(observed_series[manga_id], key, guild_id, channel_id, user_id):
+        return False
+    save_observed_series(observed_series, manga_id)
+    return True
+
+
+def unsubscribe_series(observed_series, manga_id, key):
+    """Drop a subscriber; the series stops being polled once nobody is left."""
+    series_data = observed_series[manga_id]
+    if not remove_subscriber(series_data, key):
+        return False
+    if is_orphaned(series_data):
+        delete_observed_series(observed_series, manga_id)
+    else:
+        save_observed_series(observed_series, manga_id)
+    return True
+
+
+# --- Read State --- #
+def mark_chapters_read(observed_series, manga_id, chapters, subscriber_key=None):
+    """
+    Mark a chapter ("12", "10.5") or a range ("1-500") as read, for the
+    given subscriber if the series has subscriptions.
+    Returns False if everything was already marked (or the subscriber
+    isn't subscribed); raises ValueError for anything else.
+    """
+    state = read_state(observed_series[manga_id], subscriber_key)
+    if state is None:
+        return False
+    read = ChapterSet.from_list(state.get("read_chapters", []))
+    if not read.add_item(chapters):
+        return False
+    state["read_chapters"] = read.to_list()
+    save_observed_series(observed_series, manga_id)
+    return True
+
+
+def list_unread_chapters(manga_id, info, subscriber_key=None):
+    """
+    Chapters not marked as read, from the series' chapter history (plus the
+    latest known chapter if a scraper found one MangaDex lacks). Gaps below
+    the highest read chapter count too.
+    """
+    state = read_state(info, subscriber_key) or {}
+    read = ChapterSet.from_list(state.get("read_chapters", []))
+
+    chapters = get_chapter_history().chapter_numbers(manga_id)
+    last_number = info.last_chapter_number
+    if last_number is not None and (not chapters or last_number > chapters[-1]):
+        chapters.append(last_number)
+    return read.unread(chapters)
+
+
+def resolve_read_button(manga_id, chapter_ref, chapter_number=None):
+    """
+    The chapter number a Mark-as-Read button stands for: MangaDex buttons
+    carry the chapter id (looked up in the chapter history) and the number
+    as a fallback, older ones and scraper chapters just the number.
+    """
+    if parse_chapter_number(chapter_ref) is not None:
+        return chapter_ref
+    record = get_chapter_history().get(chapter_ref)
+    if record is not None and record["manga_id"] == manga_id and record["number"] is not None:
+        return record["number"]
+    return chapter_number
+
+
 # --- Lookup Functions --- #
 def get_latest_english_chapter(manga_id, return_message=False):
-    url = "https://api.mangadex.org/chapter"
+    url = f"{http_client.MANGADEX_API}/chapter"
     params = {
         "manga": manga_id,
         "limit": 1,
@@ -293,9 +693,10 @@ def get_latest_english_chapter(manga_id, return_message=False):
     }
 
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        with metrics.timer("tracker_lookup_duration_seconds", lookup="mangadex"):
+            response = http_client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
 
         if data["data"]:
             chapter = data["data"][0]
@@ -326,14 +727,216 @@ def get_latest_english_chapter(manga_id, return_message=False):
         return None, None, error_msg
 
 
-def get_manga_by_title(title):
-    url = "https://api.mangadex.org/manga"
-    params = {"title": title, "limit": 10, "availableTranslatedLanguage[]": "en"}
+def get_latest_english_chapters(manga_ids, deadline=None):
+    """
+    Batched version of get_latest_english_chapter for many series at once.
+    Asks /manga for up to 100 series per request, then resolves their
+    latestUploadedChapter ids with one /chapter request limited to English.
+    Series whose newest upload isn't English (or that failed) fall back to
+    the per-series lookup.
+    Returns {manga_id: (chapter_id, chapter_attrs)}; series not looked up
+    before `deadline` (time.monotonic()) are left out.
+    """
+    manga_url = f"{http_client.MANGADEX_API}/manga"
+    chapter_url = f"{http_client.MANGADEX_API}/chapter"
+    latest = {}
+    unresolved = []
+
+    for start in range(0, len(manga_ids), MANGADEX_BATCH_SIZE):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        batch = manga_ids[start:start + MANGADEX_BATCH_SIZE]
+        try:
+            response = http_client.get(manga_url, params={
+                "ids[]": batch,
+                "limit": len(batch),
+                "contentRating[]": CONTENT_RATINGS,
+            })
+            response.raise_for_status()
+
+            # latestUploadedChapter id -> manga id
+            uploads = {}
+            for entry in response.json()["data"]:
+                chapter_id = entry["attributes"].get("latestUploadedChapter")
+                if chapter_id:
+                    uploads[chapter_id] = entry["id"]
+
+            if uploads:
+                response = http_client.get(chapter_url, params={
+                    "ids[]": list(uploads),
+                    "limit": len(uploads),
+                    "order[createdAt]": "desc",
+                    "translatedLanguage[]": "en",
+                    "contentRating[]": CONTENT_RATINGS,
+                })
+                response.raise_for_status()
+
+                for chapter in response.json()["data"]:
+                    manga_id = uploads.get(chapter["id"])
+                    if manga_id and manga_id not in latest:
+                        latest[manga_id] = (chapter["id"], chapter["attributes"])
+
+        except requests.RequestException as e:
+            print(f"❌ Batched chapter lookup failed, falling back per series: {e}")
+
+        unresolved.extend(mid for mid in batch if mid not in latest)
+
+    for manga_id in unresolved:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        chapter_id, chapter_attrs, _ = get_latest_english_chapter(manga_id)
+        latest[manga_id] = (chapter_id, chapter_attrs)
+
+    record_latest_chapters(latest)
+    return latest
+
+
+def record_latest_chapters(latest):
+    """
+    Store the chapters a full lookup found ({manga_id: (chapter_id, attrs)})
+    in the chapter history, so Mark-as-Read buttons for them resolve before
+    the series' history has been synced.
+    """
+    get_chapter_history().record([
+        {"id": chapter_id, "attributes": attrs, "relationships": [{"type": "manga", "id": manga_id}]}
+        for manga_id, (chapter_id, attrs) in latest.items()
+        if chapter_id is not None
+    ])
 
-    try:
-        response = requests.get(url, params=params)
+
+def get_english_chapters_since(since, tracked_ids, deadline=None):
+    """
+    Page through every English chapter created since `since` and keep the
+    newest one for each tracked series.
+    Returns {manga_id: (chapter_id, chapter_attrs)}.
+    Raises requests.RequestException, or CycleDeadlineExceeded if a page is
+    still left at `deadline` (time.monotonic()), so the caller can keep its cursor.
+    """
+    url = f"{http_client.MANGADEX_API}/chapter"
+    latest = {}
+    offset = 0
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise CycleDeadlineExceeded(url)
+        response = http_client.get(url, params=chapter_feed_params(since, offset))
         response.raise_for_status()
-        results = response.json()["data"]
+        data = response.json()
+        chapters = data["data"]
+
+        get_chapter_history().record(collect_tracked_chapters(chapters, tracked_ids, latest))
+
+        offset += len(chapters)
+        if not chapters or offset >= data.get("total", 0):
+            return latest
+
+        # offset is capped, so restart the window from the last chapter seen
+        if offset + MANGADEX_BATCH_SIZE > FEED_MAX_OFFSET:
+            since = chapters[-1]["attributes"]["createdAt"][:19]
+            offset = 0
+
+
+def chapter_feed_params(since, offset):
+    return {
+        "createdAtSince": since,
+        "translatedLanguage[]": "en",
+        "order[createdAt]": "asc",
+        "limit": MANGADEX_BATCH_SIZE,
+        "offset": offset,
+        "contentRating[]": CONTENT_RATINGS,
+    }
+
+
+def collect_tracked_chapters(chapters, tracked_ids, latest):
+    """
+    Keep the highest-numbered chapter per tracked series from an ascending
+    feed page (an older chapter backfilled in the same window mustn't hide
+    a newer one); createdAt only breaks ties.
+    Returns the page's chapters of tracked series (for the chapter history).
+    """
+    tracked = []
+    for chapter in chapters:
+        for rel in chapter.get("relationships", []):
+            if rel.get("type") == "manga" and rel.get("id") in tracked_ids:
+                kept = latest.get(rel["id"])
+                if kept is None or _chapter_rank(chapter["attributes"]) >= _chapter_rank(kept[1]):
+                    latest[rel["id"]] = (chapter["id"], chapter["attributes"])
+                tracked.append(chapter)
+                break
+    return tracked
+
+
+def _chapter_rank(attrs):
+    """Sort key: numbered chapters above unnumbered ones, then by number, then createdAt."""
+    number = parse_chapter_number(attrs.get("chapter"))
+    return number is not None, number or 0, attrs.get("createdAt") or ""
+
+
+def sync_chapter_history(manga_id):
+    """
+    Bring a series' local chapter history up to date: page through
+    /manga/{id}/feed from where the last sync stopped. Returns how many
+    chapter records were stored. Raises requests.RequestException; pages
+    stored before the failure are kept and the next sync resumes after them.
+    """
+    url = f"{http_client.MANGADEX_API}/manga/{manga_id}/feed"
+    history = get_chapter_history()
+    since = history.sync_cursor(manga_id)
+    offset = 0
+    stored = 0
+
+    while True:
+        response = http_client.get(url, params=history_feed_params(since, offset))
+        response.raise_for_status()
+        data = response.json()
+        chapters = data["data"]
+
+        stored += history.record(chapters, manga_id)
+        if chapters:
+            history.save_sync(manga_id, chapters[-1]["attributes"]["createdAt"])
+
+        offset += len(chapters)
+        if not chapters or offset >= data.get("total", 0):
+            history.save_sync(manga_id)
+            return stored
+
+        if offset + HISTORY_PAGE_SIZE > FEED_MAX_OFFSET:
+            since = chapters[-1]["attributes"]["createdAt"]
+            offset = 0
+
+
+def history_feed_params(since, offset):
+    params = {
+        "translatedLanguage[]": "en",
+        "order[createdAt]": "asc",
+        "limit": HISTORY_PAGE_SIZE,
+        "offset": offset,
+        "contentRating[]": CONTENT_RATINGS,
+    }
+    if since:
+        params["createdAtSince"] = since[:19]
+    return params
+
+
+def search_manga(title):
+    """
+    Raw /manga search results (up to 10 with English chapters), cached.
+    Raises requests.RequestException.
+    """
+    def fetch():
+        url = f"{http_client.MANGADEX_API}/manga"
+        params = {"title": title, "limit": 10, "availableTranslatedLanguage[]": "en"}
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()["data"]
+
+    key = " ".join(title.casefold().split())
+    return get_cache().get_or_fetch("search", key, fetch)
+
+
+def get_manga_by_title(title):
+    try:
+        results = search_manga(title)
 
         matches = []
         for entry in results:
@@ -348,32 +951,40 @@ def get_manga_by_title(title):
         return []
 
 
-def list_tracked_series(observed_series):
-    if not observed_series:
+def list_tracked_series(observed_series, subscriber_key=None):
+    series = [
+        info for info in observed_series.values()
+        if subscriber_key is None or visible_to(info, subscriber_key)
+    ]
+    if not series:
         return "📭 No series are being tracked."
 
     message = "**📘 Currently Tracked Series:**\n"
-    for info in observed_series.values():
-        title = info["title"]
-        chapter = info["last_chapter_number"]
-        chap_title = info["last_chapter_title"]
-        message += f"• **{title}** – Chapter {chapter}: {chap_title}\n"
+    for info in series:
+        message += f"• **{info.title}** – Chapter {info.last_chapter_number}: {info.last_chapter_title}\n"
 
     return message
 
 
 def show_latest_chapter(title, observed_series):
-    for info in observed_series.values():
-        if title.lower() in info["title"].lower():
-            chapter = info["last_chapter_number"]
-            chap_title = info["last_chapter_title"]
-            chap_id = info["last_chapter_id"]
+    for mid, info in find_series_by_title(title, observed_series):
+        record = get_chapter_history().latest(mid)
+        if record is None:
+            # history not synced yet
             return (
-                f"📖 **{info['title']}**\n"
-                f"• Chapter {chapter}: {chap_title}\n"
-                f"🔗 https://mangadex.org/chapter/{chap_id}"
+                f"📖 **{info.title}**\n"
+                f"• Chapter {info.last_chapter_number}: {info.last_chapter_title}\n"
+                f"🔗 https://mangadex.org/chapter/{info.last_chapter_id}"
             )
 
+        volume = f"Vol. {record['volume']} " if record["volume"] else ""
+        return (
+            f"📖 **{info.title}**\n"
+            f"• {volume}Chapter {record['number']}: {record['title'] or 'No title'}\n"
+            f"• Published: {record['publish_at'] or 'Unknown Date'}\n"
+            f"🔗 https://mangadex.org/chapter/{record['chapter_id']}"
+        )
+
     return "❌ No tracked series found matching that title."
 
 
@@ -389,103 +1000,72 @@ def search_manga_title(title):
 
 
 def fetch_manga_info(manga_id):
-    url = f"https://api.mangadex.org/manga/{manga_id}"
-    try:
-        r = requests.get(url)
+    def fetch():
+        url = f"{http_client.MANGADEX_API}/manga/{manga_id}"
+        r = http_client.get(url)
         r.raise_for_status()
         return r.json()["data"]
+
+    try:
+        return get_cache().get_or_fetch("manga_info", manga_id, fetch)
     except Exception as e:
         print(f"❌ Error fetching manga info: {e}")
         return None
 
 
 def show_manga_info(title, observed_series):
-    for mid, info in observed_series.items():
-        if title.lower() in info["title"].lower():
-            metadata = fetch_manga_info(mid)
-            if not metadata:
-                return "❌ Could not fetch detailed info."
-
-            attr = metadata["attributes"]
-            desc = attr["description"].get("en", "No description.")
-            status = attr.get("status", "Unknown")
-            tags = [
-                tag["attributes"]["name"].get("en", "Unknown") for tag in attr["tags"]
-            ]
-            genre_str = ", ".join(tags)
-
-            return (
-                f"📘 **{info['title']}**\n"
-                f"• Status: {status}\n"
-                f"• Genres: {genre_str}\n"
-                f"• Description: {desc[:400]}..."
-            )
+    for mid, info in find_series_by_title(title, observed_series):
+        return format_manga_info(info, fetch_manga_info(mid))
 
     return "❌ No tracked series match that title."
 
-# Helper functions
-def safe_chapter_number(value):
-    """Convert chapter number to int safely. Returns 0 if invalid."""
-    try:
-        return int(float(value))
-    except (ValueError, TypeError):
-        return 0
-    
-# UI Functions
-
-def create_chapter_buttons(manga_id, chapter_number, read_url):
-    view = View()
-
-    # Jump to chapter button
-    view.add_item(Button(label="📖 Jump to Chapter", url=read_url))
-
-    # Mark as read button (GREEN)
-    custom_id = f"markread_{manga_id}_{chapter_number}"
-    view.add_item(
-        Button(
-            label="✅ Mark as Read",
-            style=discord.ButtonStyle.green,
-            custom_id=custom_id
-        )
-    )
-
-    return view
 
+def format_manga_info(info, metadata):
+    if not metadata:
+        return "❌ Could not fetch detailed info."
 
+    attr = metadata["attributes"]
+    desc = attr["description"].get("en", "No description.")
+    status = attr.get("status", "Unknown")
+    tags = [
+        tag["attributes"]["name"].get("en", "Unknown") for tag in attr["tags"]
+    ]
+    genre_str = ", ".join(tags)
 
+    return (
+        f"📘 **{info.title}**\n"
+        f"• Status: {status}\n"
+        f"• Genres: {genre_str}\n"
+        f"• Description: {desc[:400]}..."
+    )
 
 # --- Main ---
 
 if __name__ == "__main__":
-    print("✅ MangaDex Tracker started...")
-
-    # print("✅ Running test of check_for_updates with optional scraper...")
+    import argparse
+    from profiling import PROFILE_DIR, CycleProfiler
 
-    # observed_series = load_observed_series()
+    parser = argparse.ArgumentParser(description="Run one update check over observed_series.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="use the incremental chapter feed, as the bot does")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"profile the check (cProfile, tracemalloc, slowest hosts/series) into {PROFILE_DIR}/")
+    args = parser.parse_args()
 
-    # # Run the check
-    # messages = check_for_updates(observed_series, return_messages=True)
-
-    # if messages:
-    #     print("\n📢 Updates found:")
-    #     for msg in messages:
-    #         print(msg)
-    # else:
-    #     print("✅ No new chapters found.")
-
-
-    # # Load or initialize the observed_series from file
-    # observed_series = load_observed_series()
-    # # add_series_by_title("Attack on titan", observed_series)
-    # # remove_series_by_title("Attack on titan", observed_series)
-    # # list_tracked_series(observed_series)
-    # # show_latest_chapter("Attack on titan", observed_series)
-    # # search_manga_title("Attack on titan")
-    # # show_manga_info("Attack on titan", observed_series)
-    # # manual_recheck()
-
-    # # Polling loop
-    # while True:
-    #     print(f"⏳ Checking for updates...")
-    #     check_for_updates(observed_series)
-    #     time.sleep(10)  # Check every 5 minutes
+    print("✅ MangaDex Tracker started...")
+    observed_series = load_observed_series()
+    check = check_for_updates_incremental if args.incremental else check_for_updates
+
+    if args.profile:
+        with CycleProfiler(observed_series) as profiler:
+            messages = check(observed_series, return_messages=True)
+        print(profiler.summary())
+    else:
+        messages = check(observed_series, return_messages=True)
+
+    if messages:
+        print("\n📢 Updates found:")
+        for msg in messages:
+            print(f"• {msg['title']}: chapter {msg['chapter']}")
+    else:
+        print("✅ No new chapters found.")
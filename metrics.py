@@ -0,0 +1,266 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+import http_client
+
+# In-process metrics for the poller: counters, gauges and histograms kept
+# in memory and exposed in Prometheus text format (GET /metrics on
+# METRICS_PORT) and summarised by the bot's /stats command. HTTP latency
+# and status counts come from http_client.REQUEST_HOOKS, so every request
+# the sync and async trackers make is covered.
+
+# 0 disables the endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+CYCLE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "tracker_http_request_duration_seconds": (
+        "histogram", "HTTP request latency per host, including failed attempts", LATENCY_BUCKETS),
+    "tracker_http_responses_total": (
+        "counter", "HTTP attempts per host and status code (error: no response)", None),
+    "tracker_lookup_duration_seconds": (
+        "histogram", "Time spent in chapter lookups, per lookup", LATENCY_BUCKETS),
+    "tracker_parse_duration_seconds": (
+        "histogram", "Time spent parsing scraper pages", PARSE_BUCKETS),
+    "tracker_persist_duration_seconds": (
+        "histogram", "Time spent saving tracker state, per operation", PARSE_BUCKETS),
+    "tracker_cycle_duration_seconds": (
+        "histogram", "Duration of update checks, per tracker", CYCLE_BUCKETS),
+    "tracker_poll_tick_duration_seconds": (
+        "histogram", "Duration of a polling tick (check, scheduling, history sync)", CYCLE_BUCKETS),
+    "tracker_updates_total": (
+        "counter", "New chapters detected", None),
+    "tracker_series_tracked": (
+        "gauge", "Tracked series", None),
+    "tracker_series_deferred": (
+        "gauge", "Series left unchecked at the last cycle deadline", None),
+    "tracker_last_cycle_timestamp_seconds": (
+        "gauge", "Unix time the last update check finished", None),
+    "tracker_notification_queue_depth": (
+        "gauge", "Notifications waiting for a channel worker", None),
+    "tracker_outbox_pending": (
+        "gauge", "Notifications pending in the outbox (due or waiting for a retry)", None),
+    "tracker_notifications_sent_total": (
+        "counter", "Notifications delivered to Discord", None),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= q * self.count:
+                return bound
+        return float("inf")
+
+
+_values = {}   # (name, ((label, value), ...)) -> number or Histogram
+_lock = threading.Lock()
+
+
+def _key(name, labels):
+    if name not in METRICS:
+        raise KeyError(f"Unknown metric {name}")
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = value
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _values.get(key)
+        if histogram is None:
+            histogram = _values[key] = Histogram(METRICS[name][2])
+        histogram.observe(value)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe how long the block took, whether or not it raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def record_request(host, url, status, elapsed):
+    observe("tracker_http_request_duration_seconds", elapsed, host=host)
+    inc("tracker_http_responses_total", host=host, status=status or "error")
+
+
+http_client.REQUEST_HOOKS.append(record_request)
+
+
+# --- Export ---
+
+def _series(name):
+    with _lock:
+        return sorted(
+            ((labels, value if not isinstance(value, Histogram) else _copy(value))
+             for (metric, labels), value in _values.items() if metric == name),
+            key=lambda item: item[0],
+        )
+
+
+def _copy(histogram):
+    copy = Histogram(histogram.buckets)
+    copy.counts = list(histogram.counts)
+    copy.sum, copy.count = histogram.sum, histogram.count
+    return copy
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        series = _series(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, n in zip(value.buckets + (float("inf"),), value.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {value.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {value.count}")
+    return "\n".join(lines) + "\n"
+
+
+def format_stats():
+    """A short human-readable summary for the /stats command."""
+
+    def seconds(value):
+        if value is None:
+            return "n/a"
+        if value == float("inf"):
+            return "slow"
+        return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.1f}s"
+
+    def mean(histogram):
+        return histogram.sum / histogram.count if histogram.count else None
+
+    lines = ["📊 **Poller stats**"]
+
+    cycles = _series("tracker_cycle_duration_seconds")
+    for labels, histogram in cycles:
+        tracker = dict(labels).get("tracker", "?")
+        lines.append(
+            f"🔄 {tracker} cycles: {histogram.count}, avg {seconds(mean(histogram))}, "
+            f"p99 ≤{seconds(histogram.quantile(0.99))}"
+        )
+    if not cycles:
+        lines.append("🔄 No update checks yet")
+
+    responses = {}
+    for labels, count in _series("tracker_http_responses_total"):
+        labels = dict(labels)
+        responses.setdefault(labels["host"], {})[labels["status"]] = count
+    for labels, histogram in _series("tracker_http_request_duration_seconds"):
+        host = dict(labels)["host"]
+        statuses = responses.get(host, {})
+        problems = ", ".join(
+            f"{status}×{n}" for status, n in sorted(statuses.items())
+            if status == "error" or not status.startswith(("2", "3"))
+        )
+        lines.append(
+            f"🌐 {host}: {histogram.count} requests, p50 ≤{seconds(histogram.quantile(0.5))}, "
+            f"p99 ≤{seconds(histogram.quantile(0.99))}" + (f" ({problems})" if problems else "")
+        )
+
+    for labels, histogram in _series("tracker_parse_duration_seconds"):
+        lines.append(f"🧩 Parsed {histogram.count} pages, avg {seconds(mean(histogram))}")
+    for labels, histogram in _series("tracker_persist_duration_seconds"):
+        operation = dict(labels).get("operation", "?")
+        lines.append(f"💾 {operation}: {histogram.count}×, avg {seconds(mean(histogram))}")
+
+    updates = sum(value for _, value in _series("tracker_updates_total"))
+    sent = sum(value for _, value in _series("tracker_notifications_sent_total"))
+    queued = sum(value for _, value in _series("tracker_notification_queue_depth"))
+    pending = sum(value for _, value in _series("tracker_outbox_pending"))
+    lines.append(f"📬 {updates} updates found, {sent} notifications sent, {queued} queued, {pending} pending in outbox")
+    return "\n".join(lines)
+
+
+def serve(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a background thread. Returns the server, or None if disabled."""
+    if not port:
+        return None
+    # only the bot serves metrics; the headless worker never loads http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"❌ Could not start the metrics endpoint on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return server
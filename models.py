@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+from chapter_set import parse_chapter_number
+
+# Typed in-memory model of observed_series. Series and Chapter parse chapter
+# numbers once, when they are loaded or fetched, into parse_chapter_number's
+# normalized form (12 for "12" / "12.0", 10.5 for "10.5", None when there
+# is no number), so the polling loop compares numbers instead of re-parsing
+# strings on every access. Series.from_dict / to_dict convert to and from
+# the observed_series.json format, which the storage backends keep.
+#
+# Code working with a Series uses its attributes. For compatibility it also
+# answers the dict-style access older code was written against
+# (series["title"], series.get(...), "subscribers" in series,
+# series.setdefault(...)), mapped onto the same fields; keys it doesn't
+# model are kept in `extra` and written back unchanged.
+
+SERIES_FIELDS = (
+    "title",
+    "last_chapter_id",
+    "last_chapter_number",
+    "last_chapter_title",
+    "cover_url",
+)
+# left out of the JSON while unset
+OPTIONAL_FIELDS = ("read_chapters", "optional_scraper", "subscribers")
+_MODELLED = frozenset(SERIES_FIELDS + OPTIONAL_FIELDS)
+
+
+def format_chapter_number(number):
+    """The stored form of a parsed chapter number: 12 -> "12", 10.5 -> "10.5"."""
+    return None if number is None else str(number)
+
+
+@dataclass(slots=True)
+class Chapter:
+    id: str | None
+    number: int | float | None
+    title: str | None = None
+    volume: str | None = None
+    publish_at: str | None = None
+
+    @classmethod
+    def from_api(cls, chapter_id, attrs):
+        """From a MangaDex chapter id and its attributes."""
+        return cls(
+            chapter_id,
+            parse_chapter_number(attrs.get("chapter")),
+            attrs.get("title"),
+            attrs.get("volume"),
+            attrs.get("publishAt"),
+        )
+
+
+@dataclass(slots=True)
+class Series:
+    title: str = "Unknown Title"
+    last_chapter_id: str | None = None
+    last_chapter_number: int | float | None = None
+    last_chapter_title: str | None = None
+    cover_url: str | None = None
+    read_chapters: list | None = None
+    optional_scraper: dict | None = None
+    subscribers: dict | None = None
+    extra: dict = field(default_factory=dict)
+
+    # --- Serialization ---
+
+    @classmethod
+    def from_dict(cls, data):
+        series = cls(extra={k: v for k, v in data.items() if k not in _MODELLED})
+        for key in _MODELLED:
+            if key in data:
+                series[key] = data[key]
+        return series
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in SERIES_FIELDS}
+        data["last_chapter_number"] = format_chapter_number(self.last_chapter_number)
+        for key in OPTIONAL_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        data.update(self.extra)
+        return data
+
+    def set_last_chapter(self, chapter):
+        self.last_chapter_id = chapter.id
+        self.last_chapter_number = chapter.number
+        self.last_chapter_title = chapter.title
+
+    # --- dict-style access ---
+
+    def __getitem__(self, key):
+        if key in _MODELLED:
+            value = getattr(self, key)
+            if value is None and key in OPTIONAL_FIELDS:
+                raise KeyError(key)
+            return value
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key == "last_chapter_number":
+            value = parse_chapter_number(value)
+        if key in _MODELLED:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        if key in _MODELLED:
+            return key in SERIES_FIELDS or getattr(self, key) is not None
+        return key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+def as_dict(series):
+    """The JSON form of an observed_series entry (Series, or a dict already)."""
+    return series.to_dict() if isinstance(series, Series) else series
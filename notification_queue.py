@@ -0,0 +1,136 @@
+import asyncio
+import discord
+import metrics
+from http_client import TokenBucket
+from discord_views import notification_embed, notification_view
+from outbox import get_outbox
+
+# Outbound Discord notifications, delivered from the outbox. The poller
+# records updates there as soon as each series is checked and wakes the
+# queue; one worker per channel drains its share, packs up to 10 embeds
+# into a message and paces itself to Discord's per-channel and global rate
+# limits. Failed sends are rescheduled in the outbox with backoff, and
+# whatever was undelivered at shutdown is picked up again on start().
+
+# Discord allows 10 embeds per message; each notification adds two of the 25 buttons
+MAX_EMBEDS_PER_MESSAGE = 10
+# Seconds a worker waits after the first item so a burst can share a message
+BATCH_WINDOW = 1.0
+# How often rows waiting for a retry are looked at again
+RETRY_POLL = 30
+
+# messages per second, burst: ~5 per 5s per channel, 50 requests/s per bot
+CHANNEL_RATE_LIMIT = (1, 5)
+GLOBAL_RATE_LIMIT = (50, 50)
+
+
+class NotificationQueue:
+    def __init__(self, client, default_channel_id, outbox=None):
+        self.client = client
+        self.default_channel_id = default_channel_id
+        self.outbox = outbox or get_outbox()
+        self.in_flight = set()   # outbox row ids handed to a worker
+        self.queues = {}         # channel_id -> asyncio.Queue of outbox rows
+        self.workers = {}
+        self.buckets = {}
+        self.global_bucket = TokenBucket(*GLOBAL_RATE_LIMIT)
+
+    def start(self):
+        """Deliver whatever is still in the outbox, and keep retrying failed sends."""
+        self.wake()
+        asyncio.create_task(self._retry_loop())
+
+    def enqueue(self, msg=None):
+        """Called with each tracker update; the tracker already wrote it to the outbox."""
+        self.wake()
+
+    def wake(self):
+        for row in self.outbox.due():
+            if row["id"] in self.in_flight:
+                continue
+            self.in_flight.add(row["id"])
+            self._dispatch(row)
+        metrics.set_gauge("tracker_outbox_pending", self.outbox.pending_count())
+
+    def _dispatch(self, row):
+        channel_id = row["channel_id"] or self.default_channel_id
+        queue = self.queues.get(channel_id)
+        if queue is None:
+            queue = self.queues[channel_id] = asyncio.Queue()
+            self.buckets[channel_id] = TokenBucket(*CHANNEL_RATE_LIMIT)
+            self.workers[channel_id] = asyncio.create_task(self._worker(channel_id, queue))
+        queue.put_nowait(row)
+        metrics.set_gauge("tracker_notification_queue_depth", queue.qsize(), channel=channel_id)
+
+    async def _retry_loop(self):
+        while True:
+            await asyncio.sleep(RETRY_POLL)
+            self.wake()
+
+    # --- Sending ---
+
+    async def _worker(self, channel_id, queue):
+        while True:
+            batch = [await queue.get()]
+            await asyncio.sleep(BATCH_WINDOW)
+            while len(batch) < MAX_EMBEDS_PER_MESSAGE and not queue.empty():
+                batch.append(queue.get_nowait())
+            metrics.set_gauge("tracker_notification_queue_depth", queue.qsize(), channel=channel_id)
+
+            ids = [row["id"] for row in batch]
+            try:
+                await self._deliver(channel_id, batch)
+            except Exception as e:
+                # anything _deliver doesn't handle (sqlite, discord.py internals)
+                # must not end this channel's worker: reschedule and carry on
+                print(f"❌ Delivering to {channel_id} failed unexpectedly, will retry: {e!r}")
+                try:
+                    await asyncio.to_thread(self.outbox.retry_later, ids, e)
+                except Exception as retry_error:
+                    # still pending in the outbox; the retry loop picks them up again
+                    print(f"❌ Could not reschedule notifications {ids}: {retry_error!r}")
+            finally:
+                self.in_flight.difference_update(ids)
+
+    async def _deliver(self, channel_id, batch):
+        ids = [row["id"] for row in batch]
+        bucket = self.buckets[channel_id]
+        wait = max(bucket.reserve(), self.global_bucket.reserve())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        # discord.py already retries 429s itself; anything that still fails
+        # goes back to the outbox with backoff
+        try:
+            await self._send(channel_id, batch)
+        except (discord.NotFound, discord.Forbidden) as e:
+            print(f"❌ Can't post in channel {channel_id}, dropping {len(ids)} notifications: {e}")
+            await asyncio.to_thread(self.outbox.mark_failed, ids, e)
+            return
+        except discord.HTTPException as e:
+            if e.status != 429 and e.status < 500:
+                print(f"❌ Discord rejected notifications for {channel_id}: {e}")
+                await asyncio.to_thread(self.outbox.mark_failed, ids, e)
+                return
+            delay = getattr(e, "retry_after", None)
+            if delay:
+                bucket.pause(delay)
+            await asyncio.to_thread(self.outbox.retry_later, ids, e, delay)
+            return
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"⏳ Sending to {channel_id} failed, will retry: {e}")
+            await asyncio.to_thread(self.outbox.retry_later, ids, e)
+            return
+
+        await asyncio.to_thread(self.outbox.mark_sent, ids)
+        metrics.inc("tracker_notifications_sent_total", len(ids))
+
+    async def _send(self, channel_id, batch):
+        channel = self.client.get_channel(channel_id) or await self.client.fetch_channel(channel_id)
+        notifications = [row["notification"] for row in batch]
+        user_ids = dict.fromkeys(user_id for row in batch for user_id in row["mentions"])
+        await channel.send(
+            content=" ".join(f"<@{user_id}>" for user_id in user_ids) or None,
+            embeds=[notification_embed(n) for n in notifications],
+            view=notification_view(notifications),
+        )
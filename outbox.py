@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Durable notification outbox. The tracker writes every detected chapter
+# here (one row per chapter and target channel, keyed by the MangaDex
+# chapter UUID) before it advances last_chapter_number, and the
+# notification queue delivers from it. Detecting the same chapter again
+# after a crash hits the same key and is ignored, so restarting mid-cycle
+# neither loses nor repeats notifications. Delivery is at-least-once: only
+# a crash between Discord accepting a message and mark_sent resends it.
+
+OUTBOX_FILE = os.getenv("OUTBOX_FILE", "outbox.db")
+
+MAX_ATTEMPTS = 8
+RETRY_BASE = 5.0
+RETRY_MAX = 15 * 60.0
+# sent rows are kept this long so replays are still recognised
+KEEP_SENT = 30 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id           INTEGER PRIMARY KEY,
+    chapter_key  TEXT NOT NULL,
+    target       TEXT NOT NULL,   -- channel id, or 'default'
+    channel_id   INTEGER,
+    mentions     TEXT NOT NULL,   -- JSON list of user ids
+    notification TEXT NOT NULL,   -- JSON, see mangadex_tracker.evaluate_series_update
+    status       TEXT NOT NULL DEFAULT 'pending',  -- pending | sent | failed
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created_at   REAL NOT NULL,
+    last_error   TEXT,
+    UNIQUE (chapter_key, target)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+"""
+
+
+def chapter_key(notification):
+    """The MangaDex chapter UUID; scraper chapters have none, so manga id + number."""
+    return notification.get("chapter_id") or f"{notification['manga_id']}:{notification['chapter']}"
+
+
+class Outbox:
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # the row must be on disk before the tracker state moves past it
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, msg):
+        """Record a tracker message for each of its targets. Returns how many rows were new."""
+        return self.add_many([msg])
+
+    def add_many(self, msgs):
+        """add() for several messages in one transaction (a single fsync)."""
+        now = time.time()
+        rows = []
+        for msg in msgs:
+            notification = {k: v for k, v in msg.items() if k != "targets"}
+            key = chapter_key(notification)
+            rows.extend(
+                (
+                    key,
+                    str(channel_id) if channel_id is not None else "default",
+                    channel_id,
+                    json.dumps(user_ids),
+                    json.dumps(notification),
+                    now,
+                    now,
+                )
+                for channel_id, user_ids in msg["targets"]
+            )
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO outbox
+                    (chapter_key, target, channel_id, mentions, notification, next_attempt, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            return self.conn.total_changes - before
+
+    def due(self, now=None, limit=500):
+        """Pending rows whose (next) delivery attempt is due, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT id, channel_id, mentions, notification, attempts FROM outbox
+                WHERE status = 'pending' AND next_attempt <= ?
+                ORDER BY id LIMIT ?
+                """,
+                (now or time.time(), limit),
+            ).fetchall()
+        return [
+            {
+                "id": row_id,
+                "channel_id": channel_id,
+                "mentions": json.loads(mentions),
+                "notification": json.loads(notification),
+                "attempts": attempts,
+            }
+            for row_id, channel_id, mentions, notification, attempts in rows
+        ]
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def mark_sent(self, ids):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'sent', last_error = NULL WHERE id = ?",
+                [(row_id,) for row_id in ids],
+            )
+
+    def mark_failed(self, ids, error):
+        """Give up on rows that can never be delivered (e.g. the channel is gone)."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                [(str(error), row_id) for row_id in ids],
+            )
+
+    def retry_later(self, ids, error, delay=None):
+        """Count a failed attempt and schedule the next one with backoff."""
+        now = time.time()
+        with self.lock, self.conn:
+            for row_id in ids:
+                row = self.conn.execute(
+                    "SELECT attempts FROM outbox WHERE id = ?", (row_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                if attempts >= MAX_ATTEMPTS:
+                    print(f"❌ Giving up on notification {row_id} after {attempts} attempts: {error}")
+                    status, next_attempt = "failed", now
+                else:
+                    wait = delay or min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+                    status, next_attempt = "pending", now + wait
+                self.conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                    (status, attempts, next_attempt, str(error), row_id),
+                )
+
+    def purge_sent(self):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM outbox WHERE status = 'sent' AND created_at < ?",
+                (time.time() - KEEP_SENT,),
+            )
+
+
+_outbox = None
+
+
+def get_outbox():
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox()
+        _outbox.purge_sent()
+    return _outbox
@@ -0,0 +1,163 @@
+import heapq
+import json
+import os
+import time
+from statistics import median
+
+# Adaptive per-series polling. Each series gets its own next-poll time,
+# learned from the gaps between its past releases and its MangaDex status:
+# polls get denser around the expected release and back off exponentially
+# for completed, hiatus or dormant series.
+
+SCHEDULE_FILE = "poll_schedule.json"
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+MIN_POLL_INTERVAL = 15 * MINUTE
+MAX_POLL_INTERVAL = 1 * DAY
+DORMANT_MAX_INTERVAL = 7 * DAY
+DEFAULT_RELEASE_INTERVAL = 7 * DAY
+# how many release timestamps to learn from
+HISTORY_SIZE = 10
+# a series this many expected intervals overdue is treated as dormant
+DORMANT_AFTER = 3
+
+FINISHED_STATUSES = {"completed", "cancelled"}
+
+
+class PollScheduler:
+    def __init__(self, state_file=SCHEDULE_FILE):
+        self.state_file = state_file
+        self.series = {}
+        self.heap = []
+        self.load()
+
+    # --- Persistence ---
+
+    def load(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r") as f:
+                self.series = json.load(f)
+        self.heap = [(state["next_poll"], mid) for mid, state in self.series.items()]
+        heapq.heapify(self.heap)
+
+    def save(self):
+        with open(self.state_file, "w") as f:
+            json.dump(self.series, f, indent=4)
+
+    # --- Queue ---
+
+    def sync(self, manga_ids, now=None):
+        """Schedule newly tracked series right away and forget removed ones."""
+        now = now or time.time()
+        manga_ids = set(manga_ids)
+        for mid in manga_ids:
+            if mid not in self.series:
+                self.series[mid] = {
+                    "next_poll": now,
+                    "releases": [],
+                    "status": None,
+                    "misses": 0,
+                }
+                heapq.heappush(self.heap, (now, mid))
+        for mid in list(self.series):
+            if mid not in manga_ids:
+                del self.series[mid]
+
+    def pop_due(self, budget, now=None):
+        """
+        Return the series whose poll time has come, most overdue first,
+        spending at most `budget` requests: one per poll plus one for
+        series whose release history still has to be fetched.
+        """
+        now = now or time.time()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            next_poll, mid = self.heap[0]
+            state = self.series.get(mid)
+            # drop removed series and stale entries left by a reschedule
+            if state is None or state["next_poll"] != next_poll:
+                heapq.heappop(self.heap)
+                continue
+            cost = 2 if self.needs_history(mid) else 1
+            if cost > budget:
+                break
+            heapq.heappop(self.heap)
+            budget -= cost
+            due.append(mid)
+        return due
+
+    def needs_history(self, manga_id):
+        state = self.series.get(manga_id)
+        return state is not None and not state["releases"] and state["status"] is None
+
+    def set_history(self, manga_id, release_times, status=None):
+        state = self.series.get(manga_id)
+        if state is None:
+            return
+        state["releases"] = sorted(release_times)[-HISTORY_SIZE:]
+        # "unknown" stops us refetching a history that came back empty
+        state["status"] = status or "unknown"
+
+    # --- Results ---
+
+    def record(self, manga_id, found_new, now=None):
+        """Reschedule a series after a poll (or after a release seen elsewhere)."""
+        state = self.series.get(manga_id)
+        if state is None:
+            return
+        now = now or time.time()
+
+        if found_new:
+            state["releases"] = (state["releases"] + [now])[-HISTORY_SIZE:]
+            state["misses"] = 0
+        else:
+            state["misses"] += 1
+
+        state["next_poll"] = now + self.next_delay(state, now)
+        heapq.heappush(self.heap, (state["next_poll"], manga_id))
+
+    def defer(self, manga_id, now=None):
+        """Make a series that wasn't checked this cycle due again right away, without counting a miss."""
+        state = self.series.get(manga_id)
+        if state is None:
+            return
+        state["next_poll"] = now or time.time()
+        heapq.heappush(self.heap, (state["next_poll"], manga_id))
+
+    def next_delay(self, state, now):
+        interval = release_interval(state["releases"])
+
+        if state["status"] in FINISHED_STATUSES:
+            return _backoff(DAY, state["misses"], DORMANT_MAX_INTERVAL)
+        if state["status"] == "hiatus":
+            return _backoff(6 * HOUR, state["misses"], DORMANT_MAX_INTERVAL)
+        if not state["releases"]:
+            return _backoff(MIN_POLL_INTERVAL, state["misses"], MAX_POLL_INTERVAL)
+
+        expected = state["releases"][-1] + interval
+        if now < expected:
+            # close in on the expected release by halving the remaining gap
+            return min(max((expected - now) / 2, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+        overdue = now - expected
+        if overdue > DORMANT_AFTER * interval:
+            return _backoff(MAX_POLL_INTERVAL, state["misses"], DORMANT_MAX_INTERVAL)
+        # release is due: poll often, easing off the longer it's late
+        return _backoff(MIN_POLL_INTERVAL, int(overdue // interval), MAX_POLL_INTERVAL)
+
+
+def release_interval(release_times):
+    """Typical gap between releases, or the default for short histories."""
+    if len(release_times) < 2:
+        return DEFAULT_RELEASE_INTERVAL
+    gaps = [b - a for a, b in zip(release_times, release_times[1:]) if b > a]
+    if not gaps:
+        return DEFAULT_RELEASE_INTERVAL
+    return min(max(median(gaps), HOUR), 60 * DAY)
+
+
+def _backoff(base, attempts, cap):
+    return min(base * 2 ** min(attempts, 16), cap)
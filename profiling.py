@@ -0,0 +1,163 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+import http_client
+
+# One instrumented poll cycle, for finding out where a slow cycle goes.
+# Wrap the cycle in a CycleProfiler and it writes, to PROFILE_DIR:
+#   cycle-<time>.pstats   cProfile dump (python -m pstats, snakeviz, ...)
+#   cycle-<time>.txt      top functions, top allocations (tracemalloc) and
+#                         the slowest hosts and series by request time
+#
+#   with CycleProfiler(observed_series) as profiler:
+#       check_for_updates(observed_series)
+#   print(profiler.summary())
+#
+# cProfile only sees the thread that runs the cycle: for the sync tracker
+# the scraper fetch threads show up as time spent waiting on them, and the
+# parse processes not at all. Request timings cover every thread.
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TOP_SLOWEST = 10
+# stack depth kept per allocation
+TRACEMALLOC_FRAMES = 5
+
+
+class CycleProfiler:
+    def __init__(self, observed_series, output_dir=PROFILE_DIR):
+        self.observed_series = observed_series
+        self.output_dir = output_dir
+        self.profiler = cProfile.Profile()
+        self.requests = []          # (host, url, status, elapsed)
+        self.snapshot = None
+        self.wall = None
+        self.peak_memory = None
+        self.paths = []
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        http_client.REQUEST_HOOKS.append(self.record_request)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+        self.wall = time.perf_counter() - self.started
+        self.snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        http_client.REQUEST_HOOKS.remove(self.record_request)
+        self.write_reports()
+        return False
+
+    def record_request(self, host, url, status, elapsed):
+        self.requests.append((host, url, status, elapsed))
+
+    # --- Rankings ---
+
+    def slowest_hosts(self):
+        """[(host, total_seconds, requests, slowest_seconds, failures)], slowest total first."""
+        hosts = defaultdict(lambda: [0.0, 0, 0.0, 0])
+        for host, _, status, elapsed in self.requests:
+            entry = hosts[host]
+            entry[0] += elapsed
+            entry[1] += 1
+            entry[2] = max(entry[2], elapsed)
+            if status is None or status >= 400:
+                entry[3] += 1
+        ranked = sorted(hosts.items(), key=lambda item: item[1][0], reverse=True)
+        return [(host, *entry) for host, entry in ranked]
+
+    def slowest_series(self):
+        """
+        [(manga_id, title, total_seconds, requests)], slowest first. Scraper
+        pages are matched by check_url, MangaDex requests by the manga id in
+        their path; batched lookups serve many series and aren't counted.
+        """
+        by_url = {}
+        for manga_id, series_data in self.observed_series.items():
+            check_url = (series_data.optional_scraper or {}).get("check_url")
+            if check_url:
+                by_url[check_url] = manga_id
+
+        series = defaultdict(lambda: [0.0, 0])
+        for _, url, _, elapsed in self.requests:
+            manga_id = by_url.get(url)
+            if manga_id is None:
+                parts = urlsplit(url).path.split("/")
+                if len(parts) > 2 and parts[1] == "manga" and parts[2] in self.observed_series:
+                    manga_id = parts[2]
+            if manga_id is not None:
+                series[manga_id][0] += elapsed
+                series[manga_id][1] += 1
+
+        ranked = sorted(series.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            (manga_id, getattr(self.observed_series.get(manga_id), "title", manga_id), total, count)
+            for manga_id, (total, count) in ranked
+        ]
+
+    # --- Reports ---
+
+    def write_reports(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(self.output_dir, f"cycle-{datetime.now():%Y%m%d-%H%M%S}")
+
+        self.profiler.dump_stats(f"{stem}.pstats")
+        with open(f"{stem}.txt", "w", encoding="utf-8") as f:
+            f.write(self.report())
+        self.paths = [f"{stem}.txt", f"{stem}.pstats"]
+        print(f"📝 Profile written to {stem}.txt and {stem}.pstats")
+
+    def report(self):
+        out = io.StringIO()
+        out.write(f"Poll cycle profile, {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+        out.write(f"Wall time: {self.wall:.2f}s, {len(self.requests)} requests, "
+                  f"{len(self.observed_series)} series, "
+                  f"peak traced memory {self.peak_memory / 1024 / 1024:.1f} MiB\n")
+
+        out.write("\n=== Slowest hosts (total request time) ===\n")
+        for host, total, count, slowest, failures in self.slowest_hosts()[:TOP_SLOWEST]:
+            out.write(f"{total:9.3f}s  {count:5d} requests  max {slowest:.3f}s  "
+                      f"{failures} failed  {host}\n")
+
+        out.write("\n=== Slowest series (own request time) ===\n")
+        for manga_id, title, total, count in self.slowest_series()[:TOP_SLOWEST]:
+            out.write(f"{total:9.3f}s  {count:3d} requests  {title} ({manga_id})\n")
+
+        out.write(f"\n=== Top {TOP_ALLOCATIONS} allocations (live at the end of the cycle) ===\n")
+        for stat in self.snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            out.write(f"{stat.size / 1024:10.1f} KiB  {stat.count:7d} blocks  "
+                      f"{frame.filename}:{frame.lineno}\n")
+
+        out.write(f"\n=== Top {TOP_FUNCTIONS} functions by cumulative time ===\n")
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def summary(self):
+        """A few lines for chat: wall time and the slowest hosts and series."""
+        lines = [f"⏱️ Cycle took {self.wall:.2f}s with {len(self.requests)} requests"]
+        for host, total, count, slowest, failures in self.slowest_hosts()[:3]:
+            lines.append(f"🌐 {host}: {total:.2f}s over {count} requests (max {slowest:.2f}s, {failures} failed)")
+        for _, title, total, count in self.slowest_series()[:3]:
+            lines.append(f"🐢 {title}: {total:.2f}s over {count} requests")
+        return "\n".join(lines)
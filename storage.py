@@ -0,0 +1,312 @@
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from models import Series, as_dict
+from title_index import normalize_title
+
+# Storage backends for observed_series. Both load into the same
+# {manga_id: models.Series} dict the rest of the code uses and store the
+# observed_series.json format; save() takes the manga_id that changed so the
+# SQLite backend can update just that series instead of rewriting
+# everything. Pick one with STORAGE_BACKEND=json|sqlite.
+
+STATE_FILE = "observed_series.json"
+SQLITE_FILE = "observed_series.db"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+# Seconds the JSON backend waits to coalesce writes
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", "5"))
+
+SERIES_COLUMNS = (
+    "title",
+    "last_chapter_id",
+    "last_chapter_number",
+    "last_chapter_title",
+    "cover_url",
+)
+SCRAPER_COLUMNS = ("check_url", "check_selector", "read_url_template")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    manga_id            TEXT PRIMARY KEY,
+    title               TEXT NOT NULL,
+    title_norm          TEXT NOT NULL,
+    last_chapter_id     TEXT,
+    last_chapter_number TEXT,
+    last_chapter_title  TEXT,
+    cover_url           TEXT,
+    extra               TEXT  -- JSON for any other fields
+);
+CREATE INDEX IF NOT EXISTS idx_series_title_norm ON series (title_norm);
+
+CREATE TABLE IF NOT EXISTS read_chapters (
+    manga_id TEXT NOT NULL REFERENCES series (manga_id) ON DELETE CASCADE,
+    chapter  TEXT NOT NULL,
+    PRIMARY KEY (manga_id, chapter)
+);
+
+CREATE TABLE IF NOT EXISTS scraper_configs (
+    manga_id          TEXT PRIMARY KEY REFERENCES series (manga_id) ON DELETE CASCADE,
+    check_url         TEXT,
+    check_selector    TEXT,
+    read_url_template TEXT,
+    extra             TEXT  -- JSON for per-config options (parser, chapter_regex, ...)
+);
+"""
+
+
+class JSONStore:
+    """
+    The original format: the whole dict in one JSON file. Writes are
+    coalesced: save() only marks the state dirty and a background thread
+    writes it at most once per FLUSH_INTERVAL (or when flush() is called),
+    via temp file + fsync + rename so a crash never leaves a torn file.
+    """
+
+    def __init__(self, path=STATE_FILE, flush_interval=None):
+        self.path = path
+        self.flush_interval = FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = threading.Event()
+        self.pending = None
+        self.flusher = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                return {mid: Series.from_dict(data) for mid, data in json.load(f).items()}
+        return {}
+
+    def save(self, observed_series, manga_id=None):
+        with self.lock:
+            self.pending = observed_series
+            self.dirty.set()
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self.flusher.start()
+                atexit.register(self.flush)
+
+    def delete(self, observed_series, manga_id):
+        self.save(observed_series)
+
+    def flush(self):
+        """Write pending changes now, if there are any."""
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty.is_set():
+                    return
+                self.dirty.clear()
+                observed_series = self.pending
+            try:
+                self._write(observed_series)
+            except Exception:
+                self.dirty.set()  # try again on the next flush
+                raise
+
+    def _flush_loop(self):
+        while True:
+            self.dirty.wait()
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Failed to save {self.path}: {e}")
+
+    def _write(self, observed_series):
+        # the event loop may be mutating the dict while we serialize it
+        for attempt in range(3):
+            try:
+                data = json.dumps(
+                    {mid: as_dict(series) for mid, series in observed_series.items()}, indent=4
+                )
+                break
+            except RuntimeError:
+                if attempt == 2:
+                    raise
+                time.sleep(0.01)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.path)}.", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+class SQLiteStore:
+    """SQLite in WAL mode; saves touch only the rows of the series that changed."""
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(scraper_configs)")}
+        if "extra" not in columns:
+            self.conn.execute("ALTER TABLE scraper_configs ADD COLUMN extra TEXT")
+
+    def load(self):
+        with self.lock:
+            observed_series = {}
+            rows = self.conn.execute(
+                f"SELECT manga_id, {', '.join(SERIES_COLUMNS)}, extra FROM series ORDER BY rowid"
+            )
+            for manga_id, *values, extra in rows:
+                series_data = dict(zip(SERIES_COLUMNS, values))
+                series_data["read_chapters"] = []
+                if extra:
+                    series_data.update(json.loads(extra))
+                observed_series[manga_id] = series_data
+
+            for manga_id, *values, extra in self.conn.execute(
+                f"SELECT manga_id, {', '.join(SCRAPER_COLUMNS)}, extra FROM scraper_configs"
+            ):
+                config = {
+                    key: value for key, value in zip(SCRAPER_COLUMNS, values) if value is not None
+                }
+                if extra:
+                    config.update(json.loads(extra))
+                observed_series[manga_id]["optional_scraper"] = config
+
+            for manga_id, chapter in self.conn.execute(
+                "SELECT manga_id, chapter FROM read_chapters ORDER BY rowid"
+            ):
+                observed_series[manga_id]["read_chapters"].append(chapter)
+
+        return {mid: Series.from_dict(data) for mid, data in observed_series.items()}
+
+    def save(self, observed_series, manga_id=None):
+        """Upsert one series, or every series (and drop removed ones) if manga_id is None."""
+        with self.lock, self.conn:
+            if manga_id is not None:
+                if manga_id in observed_series:
+                    self._write_series(manga_id, observed_series[manga_id])
+                return
+
+            for mid, series_data in observed_series.items():
+                self._write_series(mid, series_data)
+            stored = {row[0] for row in self.conn.execute("SELECT manga_id FROM series")}
+            for mid in stored - set(observed_series):
+                self.conn.execute("DELETE FROM series WHERE manga_id = ?", (mid,))
+
+    def delete(self, observed_series, manga_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM series WHERE manga_id = ?", (manga_id,))
+
+    def flush(self):
+        pass  # every save is already committed
+
+    def _write_series(self, manga_id, series_data):
+        series_data = as_dict(series_data)
+        known = set(SERIES_COLUMNS) | {"read_chapters", "optional_scraper"}
+        extra = {k: v for k, v in series_data.items() if k not in known}
+        values = [series_data.get(column) for column in SERIES_COLUMNS]
+        values[0] = values[0] or "Unknown Title"
+
+        self.conn.execute(
+            f"""
+            INSERT INTO series (manga_id, {', '.join(SERIES_COLUMNS)}, title_norm, extra)
+            VALUES (?, {', '.join('?' for _ in SERIES_COLUMNS)}, ?, ?)
+            ON CONFLICT (manga_id) DO UPDATE SET
+                {', '.join(f'{c} = excluded.{c}' for c in SERIES_COLUMNS)},
+                title_norm = excluded.title_norm,
+                extra = excluded.extra
+            """,
+            (manga_id, *values, normalize_title(values[0]), json.dumps(extra) if extra else None),
+        )
+
+        # read chapters: only insert/delete the difference
+        read = [str(chapter) for chapter in series_data.get("read_chapters", [])]
+        stored = {
+            row[0] for row in self.conn.execute(
+                "SELECT chapter FROM read_chapters WHERE manga_id = ?", (manga_id,)
+            )
+        }
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO read_chapters (manga_id, chapter) VALUES (?, ?)",
+            [(manga_id, chapter) for chapter in read if chapter not in stored],
+        )
+        self.conn.executemany(
+            "DELETE FROM read_chapters WHERE manga_id = ? AND chapter = ?",
+            [(manga_id, chapter) for chapter in stored - set(read)],
+        )
+
+        config = series_data.get("optional_scraper")
+        if config is None:
+            self.conn.execute("DELETE FROM scraper_configs WHERE manga_id = ?", (manga_id,))
+        else:
+            config_extra = {k: v for k, v in config.items() if k not in SCRAPER_COLUMNS}
+            self.conn.execute(
+                f"""
+                INSERT INTO scraper_configs (manga_id, {', '.join(SCRAPER_COLUMNS)}, extra)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (manga_id) DO UPDATE SET
+                    {', '.join(f'{c} = excluded.{c}' for c in SCRAPER_COLUMNS)},
+                    extra = excluded.extra
+                """,
+                (
+                    manga_id,
+                    *(config.get(column) for column in SCRAPER_COLUMNS),
+                    json.dumps(config_extra) if config_extra else None,
+                ),
+            )
+
+
+# --- Backend selection ---
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        if STORAGE_BACKEND == "sqlite":
+            first_run = not os.path.exists(SQLITE_FILE)
+            _store = SQLiteStore(SQLITE_FILE)
+            if first_run and os.path.exists(STATE_FILE):
+                migrate_json_to_sqlite(STATE_FILE, _store)
+        else:
+            _store = JSONStore(STATE_FILE)
+    return _store
+
+
+def migrate_json_to_sqlite(json_path=STATE_FILE, store=None):
+    """One-time import of an observed_series.json into the SQLite backend."""
+    store = store or SQLiteStore(SQLITE_FILE)
+    observed_series = JSONStore(json_path).load()
+    store.save(observed_series)
+    print(f"✅ Migrated {len(observed_series)} series from {json_path} to {store.path}")
+    return store
+
+
+if __name__ == "__main__":
+    # python storage.py migrate [observed_series.json] [observed_series.db]
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        json_path = sys.argv[2] if len(sys.argv) > 2 else STATE_FILE
+        db_path = sys.argv[3] if len(sys.argv) > 3 else SQLITE_FILE
+        migrate_json_to_sqlite(json_path, SQLiteStore(db_path))
+    else:
+        print("Usage: python storage.py migrate [json_path] [db_path]")
@@ -0,0 +1,110 @@
+from collections import defaultdict
+
+# Fan-out subscriptions. A tracked series keeps its subscribers in
+# observed_series[manga_id]["subscribers"], keyed by "guild_id:user_id",
+# each with the channel to notify in and that subscriber's own
+# read_chapters. The poller still checks every series once per cycle and
+# fans a new chapter out to all of its subscribers, so upstream load
+# scales with unique titles rather than subscriptions.
+#
+# Series without a "subscribers" entry predate subscriptions: they notify
+# the bot's default channel, use the top-level read_chapters and are shared
+# by everyone. When someone subscribes to one, the default channel becomes
+# its LEGACY_KEY subscriber, so the series stays shared (and can't be
+# orphaned) until it's untracked from outside a subscription.
+
+LEGACY_KEY = "default"
+
+
+def subscriber_key(guild_id, user_id):
+    return f"{guild_id or 'dm'}:{user_id}"
+
+
+def get_subscribers(series_data):
+    return series_data.get("subscribers") or {}
+
+
+def has_subscriptions(series_data):
+    return "subscribers" in series_data
+
+
+def is_subscribed(series_data, key):
+    return key in get_subscribers(series_data)
+
+
+def is_shared(series_data):
+    """Pre-subscription series: visible to everyone and announced in the default channel."""
+    return not has_subscriptions(series_data) or LEGACY_KEY in series_data["subscribers"]
+
+
+def add_subscriber(series_data, key, guild_id, channel_id, user_id):
+    """Subscribe (or move to a new channel). Returns False if already subscribed there."""
+    if not has_subscriptions(series_data):
+        # keep notifying the default channel for everyone who relied on it
+        series_data["subscribers"] = {
+            LEGACY_KEY: {"guild_id": None, "channel_id": None, "user_id": None},
+        }
+    subscribers = series_data["subscribers"]
+    existing = subscribers.get(key)
+    if existing is not None:
+        if existing["channel_id"] == channel_id:
+            return False
+        existing["channel_id"] = channel_id
+        return True
+
+    # subscribers of a shared series start from its shared read state
+    read_chapters = series_data.get("read_chapters", []) if is_shared(series_data) else []
+    subscribers[key] = {
+        "guild_id": guild_id,
+        "channel_id": channel_id,
+        "user_id": user_id,
+        "read_chapters": list(read_chapters),
+    }
+    return True
+
+
+def remove_subscriber(series_data, key):
+    return series_data.get("subscribers", {}).pop(key, None) is not None
+
+
+def is_orphaned(series_data):
+    """True once the last subscriber (the default channel included) has left, i.e. nobody needs the series polled."""
+    return has_subscriptions(series_data) and not series_data["subscribers"]
+
+
+def visible_to(series_data, key):
+    """Subscribers see their own series plus the shared pre-subscription ones."""
+    return is_shared(series_data) or is_subscribed(series_data, key)
+
+
+# --- Read state ---
+
+def read_state(series_data, key=None):
+    """
+    The dict holding read_chapters for this subscriber, or the series itself
+    (no subscriber, or someone without a subscription reading a shared series).
+    """
+    if key is not None and has_subscriptions(series_data):
+        state = series_data["subscribers"].get(key)
+        if state is None and is_shared(series_data):
+            return series_data
+        return state
+    return series_data
+
+
+# --- Fan-out ---
+
+def notification_targets(series_data):
+    """
+    {channel_id: [user_id, ...]} to notify about a new chapter; channel_id
+    None means the default channel (for series without subscriptions).
+    """
+    if not has_subscriptions(series_data):
+        return {None: []}
+
+    targets = defaultdict(list)
+    for subscriber in series_data["subscribers"].values():
+        users = targets[subscriber["channel_id"]]
+        if subscriber["user_id"] is not None:  # LEGACY_KEY mentions nobody
+            users.append(subscriber["user_id"])
+    return dict(targets)
@@ -0,0 +1,111 @@
+import unicodedata
+from collections import defaultdict
+
+# In-memory index over tracked titles (and MangaDex altTitles) so the slash
+# commands don't rescan and re-lowercase every title on each lookup.
+# Substring queries go through a trigram index.
+
+NGRAM = 3
+
+
+def normalize_title(text):
+    """Casefold, strip accents and collapse whitespace so 'Pokémon' matches 'pokemon'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def series_titles(series_data):
+    """Main title plus every alternate title stored for a series."""
+    titles = [series_data.title]
+    for alt in series_data.extra.get("alt_titles", []):
+        if isinstance(alt, dict):
+            titles.extend(alt.values())
+        else:
+            titles.append(alt)
+    return titles
+
+
+class TitleIndex:
+    def __init__(self):
+        self.names = {}                 # manga_id -> normalized names
+        self.order = {}                 # manga_id -> insertion position
+        self.grams = defaultdict(set)   # trigram -> manga_ids
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, observed_series):
+        index = cls()
+        for manga_id, series_data in observed_series.items():
+            index.add(manga_id, series_titles(series_data))
+        return index
+
+    def add(self, manga_id, titles):
+        if manga_id in self.names:
+            self.remove(manga_id)
+
+        names = list(dict.fromkeys(n for n in map(normalize_title, titles) if n))
+        self.names[manga_id] = names
+        self.order[manga_id] = self.counter
+        self.counter += 1
+
+        for name in names:
+            for gram in _ngrams(name):
+                self.grams[gram].add(manga_id)
+
+    def remove(self, manga_id):
+        names = self.names.pop(manga_id, None)
+        if names is None:
+            return
+        self.order.pop(manga_id, None)
+
+        for name in names:
+            for gram in _ngrams(name):
+                ids = self.grams.get(gram)
+                if ids is not None:
+                    ids.discard(manga_id)
+                    if not ids:
+                        del self.grams[gram]
+
+    def search(self, query):
+        """
+        manga_ids with any name containing query, best first: exact match,
+        then prefix match, then plain substring, ties in tracking order.
+        """
+        query = normalize_title(query)
+        if not query:
+            return []
+
+        grams = _ngrams(query)
+        if grams:
+            posting_lists = sorted((self.grams.get(g, set()) for g in grams), key=len)
+            candidates = set.intersection(*posting_lists) if posting_lists[0] else set()
+        else:
+            # too short for a trigram: these queries match broadly anyway
+            candidates = self.names.keys()
+
+        found = {
+            mid: True for mid in candidates
+            if any(query in name for name in self.names[mid])
+        }
+        return self._ranked(found, query)
+
+    def _ranked(self, manga_ids, query):
+        def rank(mid):
+            names = self.names[mid]
+            if query in names:
+                kind = 0
+            elif any(name.startswith(query) for name in names):
+                kind = 1
+            else:
+                kind = 2
+            return kind, self.order[mid]
+
+        return sorted(manga_ids, key=rank)
@@ -0,0 +1,126 @@
+import time
+
+# taken before the other imports so startup_seconds includes them
+STARTED = time.perf_counter()
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+import http_client
+import mangadex_tracker
+
+# Headless poller for cron jobs and scripts: runs update checks with the
+# sync tracker and writes one JSON object per line (NDJSON) for each event,
+# without importing discord, aiohttp or a parser until a page needs parsing.
+#
+#   python worker.py --once                   # one check, events on stdout
+#   python worker.py --interval 300 --incremental --output events.ndjson
+#
+# Events:
+#   {"event": "start", "startup_seconds": ..., "rss_mb": ..., "series": ...}
+#   {"event": "update", "manga_id": ..., "title": ..., "chapter": ..., ...}
+#   {"event": "cycle", "duration_seconds": ..., "updates": ..., "requests": ..., "rss_mb": ...}
+#   {"event": "error", "error": ...}
+#
+# The tracker's own log lines go to stderr. Updates are still written to
+# the outbox, so a bot running from the same directory delivers them too.
+
+WORKER_INTERVAL = float(os.getenv("WORKER_INTERVAL", "300"))
+
+
+def rss_mb():
+    """Peak resident set size of this process in MiB, None where unsupported (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class EventWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": datetime.now(timezone.utc).isoformat(timespec="seconds"), **fields}
+        self.stream.write(json.dumps(record, default=str) + "\n")
+        self.stream.flush()
+
+
+def run_cycle(events, observed_series, incremental):
+    requests_made = [0]
+
+    def count_request(host, url, status, elapsed):
+        requests_made[0] += 1
+
+    check = (
+        mangadex_tracker.check_for_updates_incremental if incremental
+        else mangadex_tracker.check_for_updates
+    )
+    http_client.REQUEST_HOOKS.append(count_request)
+    started = time.perf_counter()
+    try:
+        messages = check(observed_series, return_messages=True) or []
+    finally:
+        http_client.REQUEST_HOOKS.remove(count_request)
+
+    for msg in messages:
+        events.emit("update", **{k: v for k, v in msg.items() if k != "targets"})
+    events.emit(
+        "cycle",
+        duration_seconds=round(time.perf_counter() - started, 3),
+        updates=len(messages),
+        requests=requests_made[0],
+        series=len(observed_series),
+        rss_mb=rss_mb(),
+    )
+
+
+def main(args, events):
+    observed_series = mangadex_tracker.load_observed_series()
+    events.emit(
+        "start",
+        startup_seconds=round(time.perf_counter() - STARTED, 3),
+        rss_mb=rss_mb(),
+        series=len(observed_series),
+        incremental=args.incremental,
+    )
+
+    while True:
+        try:
+            run_cycle(events, observed_series, args.incremental)
+        except Exception as e:
+            events.emit("error", error=f"{type(e).__name__}: {e}")
+            if args.once:
+                return 1
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless tracker: poll for updates, write NDJSON events.")
+    parser.add_argument("--once", action="store_true", help="run a single check and exit")
+    parser.add_argument("--interval", type=float, default=WORKER_INTERVAL, help="seconds between checks")
+    parser.add_argument("--incremental", action="store_true", help="use the incremental chapter feed")
+    parser.add_argument("--output", help="append events to this file instead of stdout")
+    args = parser.parse_args()
+
+    stream = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    events = EventWriter(stream)
+    try:
+        # keep stdout clean for events; tracker logging goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            code = main(args, events)
+    except KeyboardInterrupt:
+        code = 0
+    finally:
+        mangadex_tracker.flush_observed_series()
+        if args.output:
+            stream.close()
+    sys.exit(code)